@@ -0,0 +1,62 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.archive import Archiver
+
+
+def create_files(directory, file_count, file_size):
+    """ Create a directory of files similar to a packaged build (compressible assets and incompressible paks) """
+    for index in range(file_count):
+        path = os.path.join(directory, "Content", f"Folder{index % 10}", f"Asset{index}.uasset")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode="wb") as file:
+            file.write((f"Asset {index} " * (file_size // 16)).encode()[:file_size // 2] + os.urandom(file_size // 2))
+    paks = os.path.join(directory, "Paks")
+    os.makedirs(paks, exist_ok=True)
+    for index in range(2):
+        with open(os.path.join(paks, f"Game{index}.pak"), mode="wb") as file:
+            file.write(os.urandom(file_count * file_size // 2))
+
+def measure(name, function, archive):
+    """ Measure how long it takes to create an archive """
+    start = time.perf_counter()
+    function()
+    duration = time.perf_counter() - start
+    print(f"{name.ljust(40)} {duration:8.2f}s {os.path.getsize(archive) / 1024 / 1024:10.1f} MB")
+
+def run(file_count, file_size, threads):
+    """ Compare the archiver against shutil.make_archive """
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "Build")
+        create_files(source, file_count, file_size)
+        archive = os.path.join(directory, "Build")
+        print(f"{'Method'.ljust(40)} {'Time'.rjust(9)} {'Size'.rjust(13)}")
+        measure("shutil.make_archive", lambda: shutil.make_archive(archive, "zip", source), f"{archive}.zip")
+        for level, store_extensions in [(6, []), (6, [".pak"]), (1, [".pak"]), (0, [])]:
+            archiver = Archiver("zip", level, store_extensions, threads)
+            name = f"Archiver zip level {level}" + (" (store .pak)" if store_extensions else "")
+            measure(name, lambda: archiver.create(source, f"{archive}.zip"), f"{archive}.zip")
+        try:
+            import zstandard
+            archiver = Archiver("tar.zst", 3, [], threads)
+            measure("Archiver tar.zst level 3", lambda: archiver.create(source, f"{archive}.tar.zst"), f"{archive}.tar.zst")
+        except ImportError:
+            print("zstandard is not installed. Skipping the tar.zst benchmark")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200, help="The number of files to archive")
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="The size of each file in bytes")
+    parser.add_argument("--threads", type=int, default=0, help="The number of threads used by the archiver")
+    arguments = parser.parse_args()
+    run(arguments.files, arguments.size, arguments.threads)
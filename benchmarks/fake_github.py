@@ -0,0 +1,164 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import re
+import json
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+read_size = 64 * 1024
+
+
+class FakeGitHub:
+    """ Local stand-in for the GitHub release API that stores the size and digest of uploaded assets """
+    server = None
+    upload_speed = 0
+    releases = {}
+    assets = {}
+
+    def __init__(self, upload_speed=0):
+        self.upload_speed = upload_speed
+        self.releases = {}
+        self.assets = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+        self.server.daemon_threads = True
+        self.server.github = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_url(self):
+        """ Get the URL used as the api_url of the config file """
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def get_id(self):
+        """ Get the ID of a new release or asset """
+        with self.lock:
+            self.next_id += 1
+            return self.next_id - 1
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """ Handle the requests sent by the GitHub class """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        """ Create a release or upload an asset """
+        github = self.server.github
+        url = urlparse(self.path)
+        match = re.match(r"^/uploads/(\d+)/assets$", url.path)
+        if match:
+            self.upload_asset(github, int(match.group(1)), parse_qs(url.query)["name"][0])
+            return
+        if not re.match(r"^/repos/[^/]+/[^/]+/releases$", url.path):
+            self.send_json(404, { "message": "Not Found" })
+            return
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+        with github.lock:
+            exists = any(release["tag_name"] == data["tag_name"] for release in github.releases.values())
+        if exists:
+            self.send_json(422, { "message": "Validation Failed", "errors": [{ "code": "already_exists" }] })
+            return
+        release_id = github.get_id()
+        host = self.headers.get("Host")
+        release = { "id": release_id, "tag_name": data["tag_name"], "name": data["name"], "draft": data.get("draft", False),
+                    "html_url": f"http://{host}/releases/{release_id}",
+                    "upload_url": f"http://{host}/uploads/{release_id}/assets{{?name,label}}" }
+        with github.lock:
+            github.releases[release_id] = release
+        self.send_json(201, release)
+
+    def do_GET(self):
+        """ Get the releases, a published release using its tag or the assets of a release """
+        github = self.server.github
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        if re.match(r"^/repos/[^/]+/[^/]+/releases$", url.path):
+            with github.lock:
+                releases = list(github.releases.values())
+            self.send_json(200, releases[(page - 1) * per_page:page * per_page])
+            return
+        match = re.match(r"^/repos/[^/]+/[^/]+/releases/tags/(.+)$", url.path)
+        if match:
+            with github.lock:
+                releases = [release for release in github.releases.values()
+                            if release["tag_name"] == match.group(1) and not release["draft"]]
+            if releases:
+                self.send_json(200, releases[0])
+            else:
+                self.send_json(404, { "message": "Not Found" })
+            return
+        match = re.match(r"^/repos/[^/]+/[^/]+/releases/(\d+)/assets$", url.path)
+        if not match:
+            self.send_json(404, { "message": "Not Found" })
+            return
+        with github.lock:
+            assets = [asset for asset in github.assets.values() if asset["release"] == int(match.group(1))]
+        self.send_json(200, assets[(page - 1) * per_page:page * per_page])
+
+    def do_PATCH(self):
+        """ Update a release (used to publish a draft release) """
+        github = self.server.github
+        match = re.match(r"^/repos/[^/]+/[^/]+/releases/(\d+)$", urlparse(self.path).path)
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+        with github.lock:
+            release = github.releases.get(int(match.group(1))) if match else None
+            if release is not None:
+                release.update(data)
+        self.send_json(200 if release is not None else 404, release or { "message": "Not Found" })
+
+    def do_DELETE(self):
+        """ Remove an asset """
+        github = self.server.github
+        match = re.match(r"^/repos/[^/]+/[^/]+/releases/assets/(\d+)$", urlparse(self.path).path)
+        with github.lock:
+            asset = github.assets.pop(int(match.group(1)), None) if match else None
+        self.send_json(204 if asset is not None else 404, None)
+
+    def upload_asset(self, github, release_id, name):
+        """ Read the uploaded file (limited to the upload speed) and store its size and digest """
+        size = int(self.headers.get("Content-Length", "0"))
+        digest = hashlib.sha256()
+        start = time.perf_counter()
+        remaining = size
+        while remaining > 0:
+            data = self.rfile.read(min(read_size, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+            if github.upload_speed > 0:
+                delay = (size - remaining) / github.upload_speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+        asset = { "id": github.get_id(), "release": release_id, "name": name, "size": size - remaining,
+                  "state": "uploaded", "digest": f"sha256:{digest.hexdigest()}" }
+        with github.lock:
+            github.assets[asset["id"]] = asset
+        self.send_json(201, asset)
+
+    def send_json(self, status, data):
+        """ Send a JSON response """
+        body = json.dumps(data).encode() if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Do not print every request """
+        pass
@@ -0,0 +1,71 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import sys
+import time
+import random
+
+modules = ["Core", "Gameplay", "Editor", "Runtime", "Network"]
+
+
+def get_argument(arguments, name):
+    """ Get the value of a -Name=Value argument passed to RunUAT (or None if it was not passed) """
+    prefix = f"-{name.lower()}="
+    for argument in arguments:
+        if argument.lower().startswith(prefix):
+            return argument[len(prefix):].strip("\"")
+    return None
+
+def create_output(directory, file_count, file_size, platform):
+    """ Create a packaged build (the content is the same for every build while the binaries are unique) """
+    for index in range(file_count):
+        path = os.path.join(directory, "Content", f"Folder{index % 10}", f"Asset{index}.uasset")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = random.Random(index).randbytes(file_size // 2)
+        with open(path, mode="wb") as file:
+            file.write((f"Asset {index} " * (file_size // 16)).encode()[:file_size - len(data)] + data)
+    binaries = os.path.join(directory, "Binaries", platform)
+    os.makedirs(binaries, exist_ok=True)
+    for module in modules:
+        with open(os.path.join(binaries, f"UnrealEditor-{module}.dll"), mode="wb") as file:
+            file.write(os.urandom(file_size))
+
+def log(message):
+    """ Print a line of the log the same way RunUAT does """
+    print(message, flush=True)
+
+def run(arguments):
+    """ Emit the log of a BuildPlugin or BuildCookRun command and create the build in the output directory """
+    file_count = int(os.environ.get("UNREALPACKAGER_BENCH_FILES", "100"))
+    file_size = int(os.environ.get("UNREALPACKAGER_BENCH_FILE_SIZE", str(256 * 1024)))
+    duration = float(os.environ.get("UNREALPACKAGER_BENCH_DURATION", "1"))
+    log_lines = int(os.environ.get("UNREALPACKAGER_BENCH_LOG_LINES", "2000"))
+    output = get_argument(arguments, "Package") or get_argument(arguments, "archivedirectory")
+    if output is None:
+        log("ERROR: No output directory specified")
+        return 1
+    platform = get_argument(arguments, "targetplatform") or "Win64"
+    log(f"Running AutomationTool {arguments[0] if arguments else ''}")
+    log("********** BUILD COMMAND STARTED **********")
+    actions = max(len(modules) * 4, 1)
+    for action in range(1, actions + 1):
+        log(f"[{action}/{actions}] Compile Module.{modules[action % len(modules)]}.{action}.cpp")
+        for line in range(log_lines // (actions * 2)):
+            log(f"LogInit: Display: Building {modules[action % len(modules)]} action {action} step {line}")
+        time.sleep(duration / 2 / actions)
+    log("********** COOK COMMAND STARTED **********")
+    for cooked in range(0, file_count + 1, max(file_count // 10, 1)):
+        log(f"LogCook: Display: Cooked packages {cooked} Packages Remain {file_count - cooked} Total {file_count}")
+        for line in range(log_lines // 20):
+            log(f"LogCook: Display: Cooking /Game/Folder{line % 10}/Asset{line}")
+        time.sleep(duration / 2 / 11)
+    print("LogCook: Warning: Some assets reference missing packages", file=sys.stderr, flush=True)
+    create_output(output, file_count, file_size, platform)
+    log("BUILD SUCCESSFUL")
+    log("AutomationTool exiting with ExitCode=0 (Success)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
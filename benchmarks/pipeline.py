@@ -0,0 +1,256 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_github import FakeGitHub
+
+scenarios = ["clean", "cached", "incremental"]
+
+
+def create_workspace(directory, arguments, api_url):
+    """ Create a synthetic plugin, project, documentation, Unreal Engine installs running the fake RunUAT and the config file """
+    plugin = os.path.join(directory, "Plugin", "BenchPlugin.uplugin")
+    os.makedirs(os.path.join(os.path.dirname(plugin), "Source", "BenchModule"), exist_ok=True)
+    with open(plugin, mode="w") as plugin_file:
+        json.dump({ "FriendlyName": "Bench Plugin", "VersionName": "1.0.0",
+                    "Modules": [{ "Name": "BenchModule", "Type": "Runtime", "PlatformAllowList": ["Win64", "Linux"] }] }, plugin_file)
+    create_source_files(os.path.join(os.path.dirname(plugin), "Source", "BenchModule"), arguments.source_files)
+    project = os.path.join(directory, "Project", "BenchProject.uproject")
+    os.makedirs(os.path.join(os.path.dirname(project), "Config"), exist_ok=True)
+    with open(project, mode="w") as project_file:
+        json.dump({ "FileVersion": 3, "Modules": [{ "Name": "BenchProject" }] }, project_file)
+    with open(os.path.join(os.path.dirname(project), "Config", "DefaultGame.ini"), mode="w") as config_file:
+        config_file.write("[/Script/EngineSettings.GeneralProjectSettings]\nProjectName=BenchProject\nProjectVersion=1.0.0\n")
+    create_source_files(os.path.join(os.path.dirname(project), "Source", "BenchProject"), arguments.source_files)
+    docs = os.path.join(directory, "Docs")
+    create_source_files(os.path.join(docs, "site"), arguments.source_files, ".html")
+    os.makedirs(os.path.join(docs, "site", "pdf"), exist_ok=True)
+    with open(os.path.join(docs, "site", "pdf", "document.pdf"), mode="wb") as pdf_file:
+        pdf_file.write(b"%PDF-1.4\n" + os.urandom(256 * 1024))
+    with open(os.path.join(docs, "mkdocs.yml"), mode="w") as mkdocs_file:
+        mkdocs_file.write("site_name: Bench\n")
+    with open(os.path.join(directory, "notes.md"), mode="w") as notes_file:
+        notes_file.write("Benchmark release\n")
+    for unreal_version in set(arguments.versions + [arguments.project_version]):
+        create_unreal_install(os.path.join(directory, "UE", f"UE_{unreal_version}"))
+    with open(os.path.join(directory, "unrealpackager.conf"), mode="w") as config_file:
+        config_file.write(f"""[environment]
+unreal_install_dir = {os.path.join(directory, "UE")}
+output = {os.path.join(directory, "Release")}
+cache_dir = {os.path.join(directory, "Cache")}
+max_parallel_builds = {arguments.parallel}
+
+[plugin]
+path = {plugin}
+unreal_versions = {", ".join(arguments.versions)}
+
+[project]
+path = {project}
+platforms = {", ".join(arguments.platforms)}
+unreal_version = {arguments.project_version}
+
+[archive]
+format = {arguments.archive_format}
+
+[mkdocs]
+path = {docs}
+include_pdf = true
+create_zip = true
+
+[github]
+create_release = true
+owner = bench
+repo = bench
+token = bench
+commit = main
+release_notes = {os.path.join(directory, "notes.md")}
+api_url = {api_url}
+""")
+
+def create_source_files(directory, file_count, extension=".cpp"):
+    """ Create the source files of a module (or the pages of the documentation) """
+    os.makedirs(directory, exist_ok=True)
+    for index in range(file_count):
+        with open(os.path.join(directory, f"File{index}{extension}"), mode="w") as source_file:
+            source_file.write(f"// File {index}\n" * 200)
+
+def create_unreal_install(directory):
+    """ Create an Unreal Engine install of which the RunUAT script runs the fake RunUAT """
+    batch_files = os.path.join(directory, "Engine", "Build", "BatchFiles")
+    os.makedirs(batch_files, exist_ok=True)
+    fake_uat = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_uat.py")
+    if os.name == "nt":
+        with open(os.path.join(batch_files, "RunUAT.bat"), mode="w") as script:
+            script.write(f"@\"{sys.executable}\" \"{fake_uat}\" %*\n")
+        return
+    script_path = os.path.join(batch_files, "RunUAT.sh")
+    with open(script_path, mode="w") as script:
+        script.write(f"#!/bin/sh\nexec \"{sys.executable}\" \"{fake_uat}\" \"$@\"\n")
+    os.chmod(script_path, 0o755)
+
+def run_scenario(directory, scenario, iteration, arguments):
+    """ Run the full pipeline of a scenario and get the total time and the time of every stage and operation """
+    if scenario == "clean":
+        shutil.rmtree(os.path.join(directory, "Cache"), ignore_errors=True)
+    if scenario != "incremental":
+        shutil.rmtree(os.path.join(directory, "Release"), ignore_errors=True)
+    with FakeGitHub(arguments.upload_speed * 1024 * 1024) as github:
+        set_api_url(directory, github.get_url())
+        command = [sys.executable, os.path.join(root, "unrealpackager.py"), "--gh-tag", f"{scenario}-{iteration}"]
+        if scenario == "incremental":
+            command.append("--incremental")
+        environment = dict(os.environ, UNREALPACKAGER_BENCH_FILES=str(arguments.files),
+                           UNREALPACKAGER_BENCH_FILE_SIZE=str(arguments.size * 1024),
+                           UNREALPACKAGER_BENCH_DURATION=str(arguments.duration),
+                           UNREALPACKAGER_BENCH_LOG_LINES=str(arguments.log_lines))
+        start = time.perf_counter()
+        with open(os.path.join(directory, f"{scenario}-{iteration}.log"), mode="w") as log_file:
+            process = subprocess.run(command, cwd=directory, env=environment, stdin=subprocess.DEVNULL,
+                                     stdout=log_file, stderr=subprocess.STDOUT)
+        total = time.perf_counter() - start
+    if process.returncode != 0:
+        raise Exception(f"The {scenario} run failed. See {os.path.join(directory, f'{scenario}-{iteration}.log')}")
+    with open(os.path.join(directory, "Release", "reports", "report.json"), mode="r") as report_file:
+        report = json.load(report_file)
+    result = { "total": total, "stages": {}, "operations": {} }
+    for measurement in report["measurements"]:
+        if measurement["category"] == "stage":
+            result["stages"][measurement["name"]] = measurement["wall_time"]
+        else:
+            operations = result["operations"]
+            operations[measurement["category"]] = operations.get(measurement["category"], 0) + measurement["wall_time"]
+    return result
+
+def set_api_url(directory, api_url):
+    """ Point the config file to the fake GitHub API of the current run """
+    config_path = os.path.join(directory, "unrealpackager.conf")
+    with open(config_path, mode="r") as config_file:
+        lines = config_file.read().splitlines()
+    lines = [f"api_url = {api_url}" if line.startswith("api_url") else line for line in lines]
+    with open(config_path, mode="w") as config_file:
+        config_file.write("\n".join(lines) + "\n")
+
+def get_median(results):
+    """ Get the median time of the total, every stage and every operation over all iterations """
+    median = { "total": statistics.median(result["total"] for result in results) }
+    for key in ["stages", "operations"]:
+        names = sorted(set(name for result in results for name in result[key]))
+        median[key] = { name: statistics.median(result[key].get(name, 0) for result in results) for name in names }
+    return median
+
+def get_commit():
+    """ Get the current commit (marked as dirty if the working tree has changes) """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if status.strip() else commit
+
+def save_results(results):
+    """ Save the results of the current commit so it can be compared with later commits """
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{results['commit']}.json")
+    with open(path, mode="w") as results_file:
+        json.dump(results, results_file, indent=4)
+    print(f"Results saved to {path}")
+
+def load_baseline(commit, current):
+    """ Load the results of a commit (or the latest results of another commit if no commit is specified) """
+    if commit:
+        path = os.path.join(results_dir, f"{commit}.json")
+        if not os.path.exists(path):
+            raise Exception(f"No results found for {commit}")
+        with open(path, mode="r") as results_file:
+            return json.load(results_file)
+    baseline = None
+    for file_name in os.listdir(results_dir) if os.path.exists(results_dir) else []:
+        with open(os.path.join(results_dir, file_name), mode="r") as results_file:
+            results = json.load(results_file)
+        if results["commit"] != current and (baseline is None or results["date"] > baseline["date"]):
+            baseline = results
+    return baseline
+
+def print_results(results, baseline):
+    """ Print the median times of every scenario and the change compared to the baseline """
+    if baseline is not None:
+        print(f"\nComparing {results['commit']} with {baseline['commit']}")
+        if baseline["parameters"] != results["parameters"]:
+            print("Warning: The baseline was measured using different parameters")
+    for scenario, median in results["scenarios"].items():
+        base = baseline["scenarios"].get(scenario) if baseline is not None else None
+        rows = [("Total", median["total"], base["total"] if base else None)]
+        for key in ["stages", "operations"]:
+            for name, duration in median[key].items():
+                label = name if key == "stages" else f"[{name}]"
+                rows.append((label, duration, base[key].get(name) if base else None))
+        width = max(len(row[0]) for row in rows) + 2
+        print(f"\n{scenario.title()}")
+        print(f"{'Name'.ljust(width)} {'Current'.rjust(10)} {'Baseline'.rjust(10)} {'Change'.rjust(8)}")
+        for name, duration, base_duration in rows:
+            line = f"{name.ljust(width)} {duration:9.3f}s"
+            if base_duration is not None:
+                line += f" {base_duration:9.3f}s"
+                if base_duration > 0:
+                    line += f" {(duration - base_duration) * 100 / base_duration:+7.1f}%"
+            print(line)
+
+def run(arguments):
+    """ Run every scenario the requested number of times and compare the results with the baseline """
+    parameters = { key: value for key, value in vars(arguments).items() if key not in ["compare", "no_save", "keep"] }
+    results = { "commit": get_commit(), "date": datetime.now(timezone.utc).isoformat(), "python": sys.version.split()[0],
+                "platform": platform.platform(), "parameters": parameters, "scenarios": {} }
+    directory = tempfile.mkdtemp(prefix="unrealpackager-bench-")
+    try:
+        create_workspace(directory, arguments, "http://127.0.0.1")
+        runs = { scenario: [] for scenario in scenarios }
+        for iteration in range(arguments.iterations):
+            for scenario in scenarios:
+                print(f"Running {scenario} scenario ({iteration + 1}/{arguments.iterations})")
+                runs[scenario].append(run_scenario(directory, scenario, iteration, arguments))
+        results["scenarios"] = { scenario: get_median(runs[scenario]) for scenario in scenarios }
+    finally:
+        if arguments.keep:
+            print(f"Workspace kept in {directory}")
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+    print_results(results, load_baseline(arguments.compare, results["commit"]))
+    if not arguments.no_save:
+        save_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--versions", type=lambda value: value.replace(" ", "").split(","), default=["5.1", "5.2", "5.3"],
+                        help="The Unreal Engine versions used to package the plugin")
+    parser.add_argument("--platforms", type=lambda value: value.replace(" ", "").split(","), default=["Win64", "Linux"],
+                        help="The platforms used to package the project")
+    parser.add_argument("--project-version", default="5.3", help="The Unreal Engine version used to package the project")
+    parser.add_argument("--files", type=int, default=100, help="The number of content files in every build")
+    parser.add_argument("--size", type=int, default=256, help="The size of every content file in KB")
+    parser.add_argument("--source-files", type=int, default=50, help="The number of source files in the plugin, project and documentation")
+    parser.add_argument("--duration", type=float, default=1.0, help="The number of seconds the fake RunUAT runs")
+    parser.add_argument("--log-lines", type=int, default=2000, help="The number of lines logged by the fake RunUAT")
+    parser.add_argument("--parallel", type=int, default=2, help="The maximum number of builds running at the same time")
+    parser.add_argument("--archive-format", default="zip", help="The archive format (zip or tar.zst)")
+    parser.add_argument("--upload-speed", type=float, default=0, help="The upload speed of the fake GitHub API in MB/s (0 is unlimited)")
+    parser.add_argument("--iterations", type=int, default=3, help="The number of times every scenario is run")
+    parser.add_argument("--compare", help="The commit to compare with (the latest results of another commit by default)")
+    parser.add_argument("--no-save", action="store_true", help="Do not save the results")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspace after the benchmark")
+    run(parser.parse_args())
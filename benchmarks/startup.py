@@ -0,0 +1,58 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+
+from modules import setup
+
+
+def measure(name, function, iterations):
+    """ Measure the average time it takes to run a function """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    duration = (time.perf_counter() - start) / iterations
+    print(f"{name.ljust(45)} {duration * 1000:10.1f} ms")
+
+def check_dependencies_with_subprocess():
+    """ Check the dependencies by starting a new interpreter for every dependency (the previous approach) """
+    for dependency in setup.dependencies:
+        subprocess.run([sys.executable, "-c", f"import {dependency}"], capture_output=True)
+
+def check_dependencies_without_cache():
+    """ Check the dependencies in-process without using the setup cache """
+    if os.path.exists(setup.cache_path):
+        os.remove(setup.cache_path)
+    setup.run_setup()
+
+def import_tasks():
+    """ Import the tasks module in a new interpreter """
+    subprocess.run([sys.executable, "-c", "import modules.tasks"], cwd=root, check=True)
+
+def import_tasks_and_requests():
+    """ Import the tasks module and requests in a new interpreter (the previous eager import) """
+    subprocess.run([sys.executable, "-c", "import modules.tasks, requests"], cwd=root, check=True)
+
+def run(iterations):
+    """ Compare the startup time of the previous and current approach """
+    print(f"{'Step'.ljust(45)} {'Average'.rjust(13)}")
+    measure("Dependency check (subprocess per dependency)", check_dependencies_with_subprocess, iterations)
+    measure("Dependency check (find_spec)", check_dependencies_without_cache, iterations)
+    setup.run_setup()
+    measure("Dependency check (cached)", setup.run_setup, iterations)
+    measure("Import tasks with requests", import_tasks_and_requests, iterations)
+    measure("Import tasks (requests imported lazily)", import_tasks, iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=10, help="The number of times every step is measured")
+    arguments = parser.parse_args()
+    run(arguments.iterations)
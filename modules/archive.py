@@ -0,0 +1,227 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import time
+import zlib
+import struct
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from modules.instrumentation import instrumentation
+
+formats = { "zip": ".zip", "tar.zst": ".tar.zst" }
+chunk_size = 1024 * 1024
+window_size = 32 * 1024
+zip64_limit = 0xFFFFFFFF
+
+
+class Archiver:
+    """ Create archives by compressing files in parallel and writing the archive in a single pass """
+    archive_format = "zip"
+    compression_level = 6
+    store_extensions = []
+    threads = 0
+
+    def __init__(self, archive_format="zip", compression_level=6, store_extensions=None, threads=0):
+        self.archive_format = archive_format
+        self.compression_level = compression_level
+        self.store_extensions = [extension.lower() for extension in store_extensions or []]
+        self.threads = threads if threads > 0 else os.cpu_count() or 1
+
+    def get_extension(self, archive_format=None):
+        """ Get the file extension of the archive format """
+        return formats[archive_format or self.archive_format]
+
+    def create(self, source, destination, archive_format=None):
+        """ Create an archive containing all the files in the source directory """
+        archive_format = archive_format or self.archive_format
+        with instrumentation.measure(f"Archive {os.path.basename(destination)}", "archive") as measurement:
+            if os.path.exists(destination):
+                os.remove(destination)
+            temp_destination = f"{destination}.tmp"
+            if archive_format == "tar.zst":
+                self.create_tar_zst(source, temp_destination)
+            else:
+                self.create_zip(source, temp_destination)
+            os.replace(temp_destination, destination)
+            measurement.bytes_read = sum(os.path.getsize(path) for path, _ in get_archive_files(source) if os.path.isfile(path))
+            measurement.bytes_written = os.path.getsize(destination)
+
+    def create_zip(self, source, destination):
+        """ Create a ZIP archive with the deflate streams of every file compressed in parallel """
+        entries = []
+        with open(destination, mode="wb") as archive, ThreadPoolExecutor(max_workers=self.threads) as executor:
+            for path, name in get_archive_files(source):
+                if os.path.isdir(path):
+                    entries.append(ZipEntry(archive, name + "/", path, 0))
+                    entries[-1].finish()
+                    continue
+                method = 8 if self.should_compress(name) else 0
+                entry = ZipEntry(archive, name, path, method)
+                pending = deque()
+                previous_tail = None
+                with open(path, mode="rb") as file:
+                    data = file.read(chunk_size)
+                    while True:
+                        next_data = file.read(chunk_size) if len(data) == chunk_size else b""
+                        last = not next_data
+                        if method == 8:
+                            pending.append((data, executor.submit(deflate, data, previous_tail, min(self.compression_level, 9), last)))
+                            previous_tail = data[-window_size:]
+                        else:
+                            pending.append((data, None))
+                        while len(pending) > self.threads * 2:
+                            entry.write(*pending.popleft())
+                        if last:
+                            break
+                        data = next_data
+                while pending:
+                    entry.write(*pending.popleft())
+                entry.finish()
+                entries.append(entry)
+            write_central_directory(archive, entries)
+
+    def create_tar_zst(self, source, destination):
+        """ Create a TAR archive compressed using multi-threaded zstd """
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("zstandard is not installed. Install it using pip install zstandard to create tar.zst archives")
+        import tarfile
+        compressor = zstandard.ZstdCompressor(level=self.compression_level, threads=self.threads)
+        with open(destination, mode="wb") as archive, compressor.stream_writer(archive) as writer:
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                for path, name in get_archive_files(source):
+                    tar.add(path, arcname=name, recursive=False)
+
+    def should_compress(self, name):
+        """ Check if a file should be compressed or stored as is """
+        return self.compression_level > 0 and os.path.splitext(name)[1].lower() not in self.store_extensions
+
+
+class ZipEntry:
+    """ Class used to write a single file to a ZIP archive """
+    name = ""
+    method = 0
+    offset = 0
+    crc = 0
+    size = 0
+    compressed_size = 0
+    zip64 = False
+
+    def __init__(self, archive, name, path, method):
+        stat = os.stat(path)
+        self.archive = archive
+        self.name = name.encode("utf-8")
+        self.method = method
+        self.offset = archive.tell()
+        self.flags = 0x800 if not name.isascii() else 0
+        self.date_time = get_dos_date_time(stat.st_mtime)
+        self.external_attributes = (stat.st_mode & 0xFFFF) << 16 | (0x10 if os.path.isdir(path) else 0)
+        self.zip64 = not os.path.isdir(path) and stat.st_size * 1.05 > zip64_limit
+        extra = struct.pack("<HHQQ", 1, 16, 0, 0) if self.zip64 else b""
+        archive.write(struct.pack("<4s2B4HL2L2H", b"PK\003\004", 45 if self.zip64 else 20, 0, self.flags, self.method,
+                                  self.date_time[1], self.date_time[0], 0, 0, 0, len(self.name), len(extra)))
+        archive.write(self.name)
+        archive.write(extra)
+
+    def write(self, data, future):
+        """ Write the next chunk of the file (using the compressed data if available) """
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        if future is not None:
+            data = future.result()
+        self.archive.write(data)
+        self.compressed_size += len(data)
+
+    def finish(self):
+        """ Update the local file header now that the CRC and sizes are known """
+        if not self.zip64 and (self.size >= zip64_limit or self.compressed_size >= zip64_limit):
+            raise Exception(f"{self.name.decode()} exceeded the expected size while being archived")
+        end = self.archive.tell()
+        self.archive.seek(self.offset + 14)
+        if self.zip64:
+            self.archive.write(struct.pack("<3L", self.crc, 0xFFFFFFFF, 0xFFFFFFFF))
+            self.archive.seek(self.offset + 30 + len(self.name) + 4)
+            self.archive.write(struct.pack("<2Q", self.size, self.compressed_size))
+        else:
+            self.archive.write(struct.pack("<3L", self.crc, self.compressed_size, self.size))
+        self.archive.seek(end)
+
+    def get_central_directory_header(self):
+        """ Get the central directory header of the entry """
+        values = []
+        size = self.size
+        compressed_size = self.compressed_size
+        offset = self.offset
+        if self.zip64 or size >= zip64_limit:
+            values.append(size)
+            size = 0xFFFFFFFF
+        if self.zip64 or compressed_size >= zip64_limit:
+            values.append(compressed_size)
+            compressed_size = 0xFFFFFFFF
+        if offset >= zip64_limit:
+            values.append(offset)
+            offset = 0xFFFFFFFF
+        extra = struct.pack(f"<HH{len(values)}Q", 1, len(values) * 8, *values) if values else b""
+        version = 45 if values else 20
+        system = 0 if os.name == "nt" else 3
+        header = struct.pack("<4s4B4HL2L5H2L", b"PK\001\002", version, system, version, 0, self.flags, self.method,
+                             self.date_time[1], self.date_time[0], self.crc, compressed_size, size, len(self.name),
+                             len(extra), 0, 0, 0, self.external_attributes, offset)
+        return header + self.name + extra
+
+
+def deflate(data, previous_tail, level, last):
+    """ Compress a chunk of a file as part of a raw deflate stream """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=previous_tail) if previous_tail else \
+        zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+def write_central_directory(archive, entries):
+    """ Write the central directory and the end of central directory record """
+    start = archive.tell()
+    for entry in entries:
+        archive.write(entry.get_central_directory_header())
+    end = archive.tell()
+    count = len(entries)
+    size = end - start
+    if count >= 0xFFFF or size >= zip64_limit or start >= zip64_limit:
+        archive.write(struct.pack("<4sQ2H2L4Q", b"PK\006\006", 44, 45, 45, 0, 0, count, count, size, start))
+        archive.write(struct.pack("<4sLQL", b"PK\006\007", 0, end, 1))
+        count = min(count, 0xFFFF)
+        size = min(size, 0xFFFFFFFF)
+        start = min(start, 0xFFFFFFFF)
+    archive.write(struct.pack("<4s4H2LH", b"PK\005\006", 0, 0, count, count, size, start, 0))
+
+def get_archive_files(source):
+    """ Get all the files and directories in the source directory with the name used in the archive """
+    files = []
+    for root, directories, file_names in os.walk(source):
+        directories.sort()
+        for name in directories + sorted(file_names):
+            path = os.path.join(root, name)
+            files.append((path, os.path.relpath(path, source).replace("\\", "/")))
+    return files
+
+def get_dos_date_time(timestamp):
+    """ Get the date and time of a file in the format used by ZIP archives """
+    date_time = time.localtime(timestamp)
+    year = min(max(date_time.tm_year, 1980), 2107)
+    return ((year - 1980) << 9 | date_time.tm_mon << 5 | date_time.tm_mday,
+            date_time.tm_hour << 11 | date_time.tm_min << 5 | date_time.tm_sec // 2)
+
+def extract_archive(archive, destination):
+    """ Extract a ZIP or tar.zst archive to the destination directory """
+    if archive.endswith(".tar.zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("zstandard is not installed. Install it using pip install zstandard to extract tar.zst archives")
+        import tarfile
+        with open(archive, mode="rb") as file, zstandard.ZstdDecompressor().stream_reader(file) as reader:
+            with tarfile.open(fileobj=reader, mode="r|") as tar:
+                tar.extractall(destination)
+    else:
+        shutil.unpack_archive(archive, destination, "zip")
@@ -13,6 +13,15 @@ class Args:
     github_tag = None
     github_commit = None
     github_prerelease = False
+    no_cache = False
+    incremental = False
+    dry_run = False
+    worker = None
+    batch = None
+    restore = None
+    restore_output = "."
+    verify = None
+    watch = False
 
     def __init__(self):
         self.parser = argparse.ArgumentParser()
@@ -27,6 +36,24 @@ class Args:
         self.parser.add_argument("--gh-prerelease", metavar="\b",
                                  help="Should the release be marked as a pre-release on GitHub?",
                                  required=False, default="false")
+        self.parser.add_argument("--no-cache", action="store_true",
+                                 help="Ignore the build cache and package everything from scratch", required=False)
+        self.parser.add_argument("--incremental", action="store_true",
+                                 help="Keep the output directory and only rebuild the outputs with changed inputs", required=False)
+        self.parser.add_argument("--dry-run", action="store_true",
+                                 help="Print the planned stages and the critical path without running them", required=False)
+        self.parser.add_argument("--watch", action="store_true",
+                                 help="Keep running and repackage the plugin, project or documentation when their files change", required=False)
+        self.parser.add_argument("--worker", metavar="\b",
+                                 help="Run as a build worker pulling jobs from the coordinator at this URL", required=False)
+        self.parser.add_argument("--batch", metavar="\b",
+                                 help="Release every package in a directory of config files or a config file with package sections", required=False)
+        self.parser.add_argument("--restore", metavar="\b",
+                                 help="Rebuild an artifact from its content manifest and the content packs next to it", required=False)
+        self.parser.add_argument("--restore-output", metavar="\b",
+                                 help="The directory where the restored artifact is saved", required=False, default=".")
+        self.parser.add_argument("--verify", metavar="\b",
+                                 help="Verify the files in an output directory using its checksum manifest", required=False)
         self.parse()
 
     def parse(self):
@@ -38,10 +65,28 @@ class Args:
         self.github_tag = args.gh_tag
         self.github_commit = args.gh_commit
         self.github_prerelease = args.gh_prerelease.lower().strip() == "true"
+        self.no_cache = args.no_cache
+        self.incremental = args.incremental
+        self.dry_run = args.dry_run
+        self.watch = args.watch
+        self.worker = args.worker
+        self.batch = args.batch
+        self.restore = args.restore
+        self.restore_output = args.restore_output
+        self.verify = args.verify
         self.print_override("GitHub Version", self.github_version, None)
         self.print_override("GitHub Tag", self.github_tag, None)
         self.print_override("GitHub Commit", self.github_commit, None)
         self.print_override("GitHub Pre-Release", self.github_prerelease, False)
+        self.print_override("Build Cache Disabled", self.no_cache, False)
+        self.print_override("Incremental", self.incremental, False)
+        self.print_override("Dry Run", self.dry_run, False)
+        self.print_override("Watch", self.watch, False)
+        self.print_override("Worker", self.worker, None)
+        self.print_override("Batch", self.batch, None)
+        self.print_override("Restore", self.restore, None)
+        self.print_override("Restore Output", self.restore_output, ".")
+        self.print_override("Verify", self.verify, None)
 
     def print_override(self, name, value, default):
         """ Print a message if the value is not the default. """
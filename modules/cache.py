@@ -0,0 +1,114 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import hashlib
+import threading
+from modules.archive import extract_archive
+from modules.checksum import hash_file
+from modules.console import console
+from modules.instrumentation import instrumentation
+from modules.staging import stager
+from modules.watcher import ignored_directories
+
+source_hashes = {}
+source_hashes_lock = threading.Lock()
+
+
+class BuildCache:
+    """ Persistent cache used to restore packaged builds when the sources did not change """
+    path = ""
+    max_size = 0
+    enabled = True
+
+    def __init__(self, path, max_size, enabled):
+        self.path = path
+        self.max_size = max_size
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(self.path, exist_ok=True)
+
+    def get_entry_path(self, key):
+        """ Get the path to the archive stored in the cache """
+        return os.path.join(self.path, f"{key}.archive")
+
+    def restore(self, key, archive, output):
+        """ Restore a cached build to the output directory. Returns False if the build is not cached """
+        if not self.enabled:
+            return False
+        entry = self.get_entry_path(key)
+        if not os.path.exists(entry):
+            return False
+        os.utime(entry)
+        instrumentation.mark_reused()
+        with instrumentation.measure(f"Restore {os.path.basename(archive)}", "cache") as measurement:
+            stager.link(entry, archive)
+            extract_archive(archive, output)
+            measurement.bytes_read += os.path.getsize(entry)
+            measurement.bytes_written += sum(os.path.getsize(path) for path in get_files(output))
+        return True
+
+    def store(self, key, archive):
+        """ Store the archive of a build in the cache and evict the least recently used builds """
+        if not self.enabled:
+            return
+        stager.link(archive, self.get_entry_path(key))
+        self.evict()
+
+    def evict(self):
+        """ Remove the least recently used builds until the cache is within the maximum size """
+        with self.lock:
+            entries = []
+            for file_name in os.listdir(self.path):
+                if file_name.endswith(".archive"):
+                    stat = os.stat(os.path.join(self.path, file_name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(self.path, file_name)))
+            size = sum(entry[1] for entry in entries)
+            for _, entry_size, entry_path in sorted(entries):
+                if size <= self.max_size:
+                    break
+                console.print(f"Removing {os.path.basename(entry_path)} from the build cache")
+                os.remove(entry_path)
+                size -= entry_size
+
+
+def get_build_key(sources, *parts):
+    """ Get the key of a build using the sources and any other values affecting the build """
+    key = hashlib.sha256(hash_sources(sources).encode())
+    for part in parts:
+        key.update(b"\0")
+        key.update(str(part).encode())
+    return key.hexdigest()
+
+def hash_sources(sources):
+    """ Get the hash of the source files and directories (only calculated once per run and build output is skipped) """
+    sources = tuple(sources)
+    with source_hashes_lock:
+        if sources in source_hashes:
+            return source_hashes[sources]
+    digest = hashlib.sha256()
+    for source in sources:
+        for file_path in get_files(source, ignored_directories):
+            digest.update(os.path.relpath(file_path, os.path.dirname(source)).replace("\\", "/").encode())
+            digest.update(b"\0")
+            digest.update(hash_file(file_path).encode())
+    with source_hashes_lock:
+        source_hashes[sources] = digest.hexdigest()
+    return source_hashes[sources]
+
+def clear_source_hashes():
+    """ Forget the hashes of the sources so they are calculated again (used when the sources changed during a run) """
+    with source_hashes_lock:
+        source_hashes.clear()
+
+def get_files(path, excluded_directories=()):
+    """ Get a sorted list of all the files in a directory (or the path itself if it is a file) """
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, directories, file_names in os.walk(path):
+        directories[:] = sorted(directory for directory in directories if directory not in excluded_directories)
+        for file_name in sorted(file_names):
+            files.append(os.path.join(root, file_name))
+    return files
@@ -0,0 +1,105 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import json
+import mmap
+import zipfile
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from modules.console import console
+from modules.instrumentation import instrumentation
+from modules.staging import format_size
+
+checksum_file_name = "SHA256SUMS"
+manifest_file_name = "SHA256SUMS.json"
+slice_size = 8 * 1024 * 1024
+
+
+def hash_file(path):
+    """ Get the SHA-256 hash of a file (large files are measured and hashed in slices of a memory map since hashlib releases the GIL for large slices) """
+    size = os.path.getsize(path)
+    if size < slice_size:
+        with open(path, mode="rb") as file:
+            digest = hashlib.sha256(file.read())
+        instrumentation.add_bytes_read(size)
+        return digest.hexdigest()
+    digest = hashlib.sha256()
+    with instrumentation.measure(f"Hash {os.path.basename(path)}", "checksum") as measurement:
+        with open(path, mode="rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            with memoryview(data) as view:
+                for offset in range(0, size, slice_size):
+                    digest.update(view[offset:offset + slice_size])
+        measurement.bytes_read = size
+    return digest.hexdigest()
+
+def hash_files(files, threads=0):
+    """ Hash every file in parallel and get the size and hash of each file """
+    with ThreadPoolExecutor(max_workers=threads or None) as executor:
+        digests = list(executor.map(hash_file, files))
+    return { file: (os.path.getsize(file), digest) for file, digest in zip(files, digests) }
+
+def verify_archive(path):
+    """ Check that a ZIP archive is complete by reading its central directory and the location of every entry """
+    if not path.lower().endswith(".zip"):
+        return
+    try:
+        with zipfile.ZipFile(path) as archive:
+            entries = archive.infolist()
+    except zipfile.BadZipFile as error:
+        raise Exception(f"{os.path.basename(path)} is not a complete ZIP archive: {error}")
+    size = os.path.getsize(path)
+    for entry in entries:
+        if entry.header_offset + entry.compress_size > size:
+            raise Exception(f"{os.path.basename(path)} is not a complete ZIP archive: {entry.filename} is truncated")
+
+def write_checksums(directory, files, threads=0):
+    """ Verify the archives and write the SHA256SUMS file and JSON manifest of the files in the directory """
+    for file in files:
+        verify_archive(file)
+    checksums = hash_files(files, threads)
+    entries = [{ "name": os.path.basename(file), "size": size, "sha256": digest } for file, (size, digest) in checksums.items()]
+    entries.sort(key=lambda entry: entry["name"])
+    checksum_path = os.path.join(directory, checksum_file_name)
+    with open(checksum_path + ".tmp", mode="w", newline="\n") as checksum_file:
+        for entry in entries:
+            checksum_file.write(f"{entry['sha256']}  {entry['name']}\n")
+    os.replace(checksum_path + ".tmp", checksum_path)
+    manifest_path = os.path.join(directory, manifest_file_name)
+    with open(manifest_path + ".tmp", mode="w") as manifest_file:
+        json.dump({ "algorithm": "sha256", "files": entries }, manifest_file, indent=4)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    console.print(f"Saved checksums of {len(entries)} file(s) ({format_size(sum(entry['size'] for entry in entries))}) "
+                  f"to {checksum_path}")
+    return [checksum_path, manifest_path]
+
+def load_checksums(directory):
+    """ Load the size and hash of every file in the JSON manifest of a directory """
+    manifest_path = os.path.join(directory, manifest_file_name)
+    if not os.path.exists(manifest_path):
+        raise Exception(f"Checksum manifest {manifest_path} could not be found")
+    with open(manifest_path, mode="r") as manifest_file:
+        manifest = json.load(manifest_file)
+    return { entry["name"]: (entry["size"], entry["sha256"]) for entry in manifest["files"] }
+
+def verify_directory(directory, threads=0):
+    """ Verify the size and hash of every file in the checksum manifest of a directory """
+    directory = os.path.abspath(directory)
+    print(f"Verifying checksums in {directory}")
+    checksums = load_checksums(directory)
+    errors = [f"{name} could not be found" for name in checksums if not os.path.isfile(os.path.join(directory, name))]
+    files = [os.path.join(directory, name) for name in checksums if os.path.isfile(os.path.join(directory, name))]
+    for file, (size, digest) in hash_files(files, threads).items():
+        name = os.path.basename(file)
+        if (size, digest) != checksums[name]:
+            errors.append(f"{name} does not match its checksum")
+            continue
+        try:
+            verify_archive(file)
+        except Exception as error:
+            errors.append(str(error))
+    for error in errors:
+        print(f"FAILED: {error}")
+    if errors:
+        raise Exception(f"{len(errors)} of {len(checksums)} file(s) failed verification")
+    print(f"Verified {len(checksums)} file(s)")
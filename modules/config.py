@@ -8,14 +8,34 @@ import configparser
 
 class Config:
     """ Helper class used to read the config file, extract values and verify the configuration """
+    name = ""
+    path = ""
     unreal_install_dir = ""
     output = ""
+    incremental = False
+    dry_run = False
+    max_parallel_builds = 1
+    fail_fast = True
+    cache_dir = ""
+    cache_size = 0
     project_path = ""
     project_platforms = []
     project_unreal_version = ""
+    project_shared_build = False
+    project_ddc_path = ""
     plugin_path = ""
     plugin_unreal_versions = []
     plugin_visual_studio = ""
+    archive_format = ""
+    archive_compression_level = 0
+    archive_store_extensions = []
+    archive_threads = 0
+    dedup_enabled = False
+    dedup_chunk_size = 0
+    dedup_reuse_previous = True
+    dedup_upload_archives = False
+    checksums_enabled = True
+    checksums_threads = 0
     mkdocs_path = ""
     mkdocs_auto_deploy = False
     mkdocs_include_pdf = False
@@ -26,20 +46,70 @@ class Config:
     github_token = ""
     github_commit = ""
     github_release_notes = ""
+    github_api_url = ""
+    github_upload_threads = 1
+    github_upload_retries = 0
+    distributed_enabled = False
+    distributed_host = ""
+    distributed_port = 0
+    distributed_token = ""
+    distributed_job_timeout = 0
+    worker = None
+    worker_name = ""
+    resources_enabled = False
+    resources_memory = None
+    resources_cpu = None
+    resources_min_free_disk = 0
+    resources_default_memory = 0
+    resources_default_cpu = 0
+    resources_default_disk = 0
+    watch_debounce = 0
+    watch_poll_interval = 0
+    logs_max_errors = 0
+    logs_echo = False
+    report_formats = []
+    report_trace = False
     task_pre = None
     task_post = None
 
-    def __init__(self):
+    def __init__(self, args=None, path="unrealpackager.conf", package=None, name=None):
+        self.name = name or ""
+        self.path = os.path.abspath(path)
         config = configparser.ConfigParser()
-        config.read("unrealpackager.conf")
+        config.read(path)
+        if package is not None:
+            config = get_package_config(config, package)
         self.unreal_install_dir = config.get("environment", "unreal_install_dir", fallback="")
         self.output = config.get("environment", "output", fallback="")
+        if name and package is None and self.output:
+            # Every config file in a batch directory gets its own directory in the output directory (like package sections do)
+            self.output = os.path.join(self.output, name)
+        self.incremental = config.get("environment", "incremental", fallback="false").replace(" ", "").lower() != "false"
+        if args is not None and (args.incremental or args.watch):
+            self.incremental = True
+        self.dry_run = args is not None and args.dry_run
+        self.max_parallel_builds = config.get("environment", "max_parallel_builds", fallback="1").strip()
+        self.fail_fast = config.get("environment", "fail_fast", fallback="true").replace(" ", "").lower() != "false"
+        self.cache_dir = config.get("environment", "cache_dir", fallback=".cache")
+        self.cache_size = config.get("environment", "cache_size", fallback="50").strip()
         self.project_path = config.get("project", "path", fallback="")
         self.project_platforms = list(filter(None, config.get("project", "platforms", fallback="").replace(" ", "").split(",")))
         self.project_unreal_version = config.get("project", "unreal_version", fallback="")
+        self.project_shared_build = config.get("project", "shared_build", fallback="false").replace(" ", "").lower() != "false"
+        self.project_ddc_path = config.get("project", "ddc_path", fallback="").strip()
         self.plugin_path = config.get("plugin", "path", fallback="")
         self.plugin_unreal_versions = list(filter(None, config.get("plugin", "unreal_versions", fallback="").replace(" ", "").split(",")))
         self.plugin_visual_studio = config.get("plugin", "visual_studio", fallback="2019")
+        self.archive_format = config.get("archive", "format", fallback="zip").strip().lower()
+        self.archive_compression_level = config.get("archive", "compression_level", fallback="6").strip()
+        self.archive_store_extensions = list(filter(None, config.get("archive", "store_extensions", fallback=".pak, .ucas, .utoc").replace(" ", "").lower().split(",")))
+        self.archive_threads = config.get("archive", "threads", fallback="0").strip()
+        self.dedup_enabled = config.get("dedup", "enabled", fallback="false").replace(" ", "").lower() != "false"
+        self.dedup_chunk_size = config.get("dedup", "chunk_size", fallback="1024").strip()
+        self.dedup_reuse_previous = config.get("dedup", "reuse_previous", fallback="true").replace(" ", "").lower() != "false"
+        self.dedup_upload_archives = config.get("dedup", "upload_archives", fallback="false").replace(" ", "").lower() != "false"
+        self.checksums_enabled = config.get("checksums", "enabled", fallback="true").replace(" ", "").lower() != "false"
+        self.checksums_threads = config.get("checksums", "threads", fallback="0").strip()
         self.mkdocs_path = config.get("mkdocs", "path", fallback=".")
         self.mkdocs_auto_deploy = config.get("mkdocs", "auto_deploy", fallback="false").replace(" ", "").lower() != "false"
         self.mkdocs_include_pdf = config.get("mkdocs", "include_pdf", fallback="false").replace(" ", "").lower() != "false"
@@ -50,6 +120,29 @@ class Config:
         self.github_token = config.get("github", "token", fallback="")
         self.github_commit = config.get("github", "commit", fallback="")
         self.github_release_notes = config.get("github", "release_notes", fallback="")
+        self.github_api_url = config.get("github", "api_url", fallback="https://api.github.com").strip()
+        self.github_upload_threads = config.get("github", "upload_threads", fallback="4").strip()
+        self.github_upload_retries = config.get("github", "upload_retries", fallback="5").strip()
+        self.distributed_enabled = config.get("distributed", "enabled", fallback="false").replace(" ", "").lower() != "false"
+        self.distributed_host = config.get("distributed", "host", fallback="0.0.0.0").strip()
+        self.distributed_port = config.get("distributed", "port", fallback="8790").strip()
+        self.distributed_token = config.get("distributed", "token", fallback="").strip()
+        self.distributed_job_timeout = config.get("distributed", "job_timeout", fallback="600").strip()
+        self.worker = args.worker if args is not None else None
+        self.worker_name = config.get("distributed", "worker_name", fallback="").strip()
+        self.resources_enabled = config.get("resources", "enabled", fallback="false").replace(" ", "").lower() != "false"
+        self.resources_memory = config.get("resources", "memory", fallback="auto").strip().lower()
+        self.resources_cpu = config.get("resources", "cpu", fallback="auto").strip().lower()
+        self.resources_min_free_disk = config.get("resources", "min_free_disk", fallback="10").strip()
+        self.resources_default_memory = config.get("resources", "default_memory", fallback="8").strip()
+        self.resources_default_cpu = config.get("resources", "default_cpu", fallback="4").strip()
+        self.resources_default_disk = config.get("resources", "default_disk", fallback="10").strip()
+        self.watch_debounce = config.get("watch", "debounce", fallback="500").strip()
+        self.watch_poll_interval = config.get("watch", "poll_interval", fallback="1000").strip()
+        self.logs_max_errors = config.get("logs", "max_errors", fallback="10").strip()
+        self.logs_echo = config.get("logs", "echo", fallback="false").replace(" ", "").lower() != "false"
+        self.report_formats = list(filter(None, config.get("report", "formats", fallback="json, csv").replace(" ", "").lower().split(",")))
+        self.report_trace = config.get("report", "trace", fallback="false").replace(" ", "").lower() != "false"
         self.task_pre = config.get("tasks", "pre", fallback=None)
         self.task_post = config.get("tasks", "post", fallback=None)
         self.verify()
@@ -61,12 +154,31 @@ class Config:
         self.unreal_install_dir = os.path.abspath(self.unreal_install_dir)
         if not os.path.exists(self.unreal_install_dir):
             raise Exception("Invalid Unreal Engine installation directory")
+        if self.worker:
+            self.verify_worker()
+            return
         if not self.output or self.output.isspace():
             raise Exception("Output path not specified in config file")
         self.output = os.path.abspath(self.output)
-        if os.path.exists(self.output):
-            shutil.rmtree(self.output)
-        os.makedirs(self.output, exist_ok=True)
+        if not self.dry_run:
+            if os.path.exists(self.output) and not self.incremental:
+                shutil.rmtree(self.output)
+            os.makedirs(self.output, exist_ok=True)
+        if not self.max_parallel_builds.isdigit() or int(self.max_parallel_builds) < 1:
+            raise Exception("Invalid maximum number of parallel builds. Only positive integers are allowed")
+        self.max_parallel_builds = int(self.max_parallel_builds)
+        if not self.cache_dir or self.cache_dir.isspace():
+            raise Exception("Build cache directory not specified in config file")
+        self.cache_dir = os.path.abspath(self.cache_dir)
+        if self.cache_dir == self.output or self.cache_dir.startswith(os.path.join(self.output, "")):
+            raise Exception("Build cache directory can not be inside the output directory")
+        if not self.cache_size.isdigit():
+            raise Exception("Invalid build cache size. Only integers are allowed")
+        self.cache_size = int(self.cache_size) * 1024 * 1024 * 1024
+        if self.project_shared_build:
+            self.project_ddc_path = os.path.abspath(self.project_ddc_path or os.path.join(self.cache_dir, "DerivedDataCache"))
+            if self.project_ddc_path == self.output or self.project_ddc_path.startswith(os.path.join(self.output, "")):
+                raise Exception("Shared DerivedDataCache directory can not be inside the output directory")
         if self.plugin_path and not self.plugin_path.isspace():
             self.plugin_path = os.path.abspath(self.plugin_path)
             if not os.path.exists(self.plugin_path):
@@ -76,7 +188,7 @@ class Config:
             if not self.plugin_unreal_versions:
                 raise Exception("No Unreal Engine versions specified in config file")
             for unreal_version in self.plugin_unreal_versions:
-                if not os.path.exists(os.path.join(self.unreal_install_dir, f"UE_{unreal_version}")):
+                if not self.distributed_enabled and not os.path.exists(os.path.join(self.unreal_install_dir, f"UE_{unreal_version}")):
                     raise Exception(f"Unreal Engine {unreal_version} is not installed")
             if not self.plugin_visual_studio.isdigit():
                 raise Exception("Invalid Visual Studio version number provided. Only integers are allowed")
@@ -95,6 +207,24 @@ class Config:
                 raise Exception("No Unreal Engine versions specified in config file")
             if not os.path.exists(os.path.join(self.unreal_install_dir, f"UE_{self.project_unreal_version}")):
                 raise Exception(f"Unreal Engine {self.project_unreal_version} is not installed")
+        if self.archive_format not in ["zip", "tar.zst"]:
+            raise Exception(f"{self.archive_format} is not a supported archive format. Only zip and tar.zst is supported")
+        if not self.archive_compression_level.isdigit():
+            raise Exception("Invalid archive compression level. Only integers are allowed")
+        self.archive_compression_level = int(self.archive_compression_level)
+        if self.archive_format == "zip" and self.archive_compression_level > 9:
+            raise Exception("Invalid archive compression level. ZIP archives only support levels 0 to 9")
+        if self.archive_format == "tar.zst" and not 1 <= self.archive_compression_level <= 22:
+            raise Exception("Invalid archive compression level. tar.zst archives only support levels 1 to 22")
+        if not self.archive_threads.isdigit():
+            raise Exception("Invalid number of archive threads. Only integers are allowed")
+        self.archive_threads = int(self.archive_threads)
+        if not self.dedup_chunk_size.isdigit() or not 16 <= int(self.dedup_chunk_size) <= 65536:
+            raise Exception("Invalid chunk size. Only integers between 16 and 65536 KB are allowed")
+        self.dedup_chunk_size = int(self.dedup_chunk_size) * 1024
+        if not self.checksums_threads.isdigit():
+            raise Exception("Invalid number of checksum threads. Only integers are allowed")
+        self.checksums_threads = int(self.checksums_threads)
         if self.mkdocs_auto_deploy or self.mkdocs_include_pdf or self.mkdocs_create_zip:
             self.mkdocs_path = os.path.abspath(self.mkdocs_path)
             if not os.path.exists(os.path.join(self.mkdocs_path, "mkdocs.yml")):
@@ -113,6 +243,35 @@ class Config:
             self.github_release_notes = os.path.abspath(self.github_release_notes)
             if not os.path.exists(self.github_release_notes):
                 raise Exception("Release notes file could not be found")
+            if not self.github_api_url or self.github_api_url.isspace():
+                raise Exception("Github release is enabled but the API URL is not specified in config file")
+            if not self.github_upload_threads.isdigit() or int(self.github_upload_threads) < 1:
+                raise Exception("Invalid number of upload threads. Only positive integers are allowed")
+            self.github_upload_threads = int(self.github_upload_threads)
+            if not self.github_upload_retries.isdigit():
+                raise Exception("Invalid number of upload retries. Only integers are allowed")
+            self.github_upload_retries = int(self.github_upload_retries)
+        if self.distributed_enabled:
+            if not self.distributed_token:
+                raise Exception("Distributed builds are enabled but token is not specified in config file")
+            if not self.distributed_port.isdigit() or not 0 < int(self.distributed_port) < 65536:
+                raise Exception("Invalid coordinator port. Only integers between 1 and 65535 are allowed")
+            self.distributed_port = int(self.distributed_port)
+            if not self.distributed_job_timeout.isdigit() or int(self.distributed_job_timeout) < 1:
+                raise Exception("Invalid job timeout. Only positive integers are allowed")
+            self.distributed_job_timeout = int(self.distributed_job_timeout)
+        if self.resources_enabled:
+            self.verify_resources()
+        if not self.watch_debounce.isdigit():
+            raise Exception("Invalid watch debounce. Only integers (milliseconds) are allowed")
+        self.watch_debounce = int(self.watch_debounce) / 1000
+        if not self.watch_poll_interval.isdigit() or int(self.watch_poll_interval) < 1:
+            raise Exception("Invalid watch poll interval. Only positive integers (milliseconds) are allowed")
+        self.watch_poll_interval = int(self.watch_poll_interval) / 1000
+        self.verify_logs()
+        for report_format in self.report_formats:
+            if report_format not in ["json", "csv"]:
+                raise Exception(f"{report_format} is not a supported report format. Only json and csv is supported")
         if self.task_pre and not self.task_pre.isspace():
             self.task_pre = os.path.abspath(os.path.join(os.path.dirname(__file__), "..\\", self.task_pre))
             if not os.path.exists(self.task_pre):
@@ -125,3 +284,73 @@ class Config:
                 raise Exception(f"Post-task {self.task_post} does not exist")
             if not self.task_post.endswith(".py"):
                 raise Exception("Invalid post-task. Only Python scripts are currently supported")
+
+    def verify_worker(self):
+        """ Verify the values used when running as a build worker """
+        if not self.worker.startswith("http://") and not self.worker.startswith("https://"):
+            raise Exception("Invalid coordinator URL. Must start with http:// or https://")
+        if not self.distributed_token:
+            raise Exception("Token of the coordinator is not specified in config file")
+        if not self.cache_dir or self.cache_dir.isspace():
+            raise Exception("Build cache directory not specified in config file")
+        self.cache_dir = os.path.abspath(self.cache_dir)
+        if not self.archive_threads.isdigit():
+            raise Exception("Invalid number of archive threads. Only integers are allowed")
+        self.archive_threads = int(self.archive_threads)
+        self.verify_logs()
+
+    def verify_resources(self):
+        """ Verify the memory, CPU and disk budgets used to schedule the builds """
+        gigabyte = 1024 * 1024 * 1024
+        if self.resources_memory != "auto" and (not self.resources_memory.isdigit() or int(self.resources_memory) < 1):
+            raise Exception("Invalid memory budget. Only auto or positive integers (GB) are allowed")
+        self.resources_memory = None if self.resources_memory == "auto" else int(self.resources_memory) * gigabyte
+        if self.resources_cpu != "auto" and (not self.resources_cpu.isdigit() or int(self.resources_cpu) < 1):
+            raise Exception("Invalid CPU budget. Only auto or positive integers are allowed")
+        self.resources_cpu = None if self.resources_cpu == "auto" else int(self.resources_cpu)
+        for name in ["min_free_disk", "default_memory", "default_cpu", "default_disk"]:
+            if not getattr(self, f"resources_{name}").isdigit():
+                raise Exception(f"Invalid {name.replace('_', ' ')}. Only integers are allowed")
+        self.resources_min_free_disk = int(self.resources_min_free_disk) * gigabyte
+        self.resources_default_memory = int(self.resources_default_memory) * gigabyte
+        self.resources_default_cpu = int(self.resources_default_cpu)
+        self.resources_default_disk = int(self.resources_default_disk) * gigabyte
+
+    def verify_logs(self):
+        """ Verify the values used when saving the build logs """
+        if not self.logs_max_errors.isdigit():
+            raise Exception("Invalid maximum number of errors. Only integers are allowed")
+        self.logs_max_errors = int(self.logs_max_errors)
+
+
+def get_batch_packages(path):
+    """ Get the name, config file and section name of every package in a batch (a directory of config files or a config file with package sections) """
+    if os.path.isdir(path):
+        return [(os.path.splitext(file_name)[0], os.path.join(path, file_name), None)
+                for file_name in sorted(os.listdir(path)) if file_name.endswith(".conf")]
+    if not os.path.isfile(path):
+        raise Exception(f"Batch {path} does not exist")
+    config = configparser.ConfigParser()
+    config.read(path)
+    names = sorted(set(section.partition(":")[2] for section in config.sections() if section.startswith(("plugin:", "project:"))))
+    return [(name, path, name) for name in names]
+
+def get_package_config(config, package):
+    """ Get the configuration of a package in a batch file (sections named section:package override the shared sections) """
+    package_config = configparser.ConfigParser()
+    for section in config.sections():
+        if ":" not in section:
+            package_config[section] = dict(config.items(section, raw=True))
+    for section in config.sections():
+        name, _, section_package = section.partition(":")
+        if section_package != package:
+            continue
+        if not package_config.has_section(name):
+            package_config.add_section(name)
+        for key, value in config.items(section, raw=True):
+            package_config.set(name, key, value)
+    if not config.has_option(f"environment:{package}", "output"):
+        if not package_config.has_section("environment"):
+            package_config.add_section("environment")
+        package_config.set("environment", "output", os.path.join(config.get("environment", "output", fallback=""), package))
+    return package_config
@@ -0,0 +1,70 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import sys
+import time
+import shutil
+import threading
+
+status_interval = 0.2
+
+
+class Console:
+    """ Print messages and the live status of the running builds without mixing up the output of parallel builds """
+    statuses = {}
+    live = False
+    visible = False
+    last_render = 0.0
+
+    def __init__(self):
+        self.statuses = {}
+        self.printed = {}
+        self.lock = threading.Lock()
+        self.live = sys.stdout.isatty()
+
+    def print(self, message):
+        """ Print a message above the status line """
+        with self.lock:
+            self.clear()
+            print(message, flush=True)
+            self.render()
+
+    def set_status(self, name, phase, status):
+        """ Update the status of a running build (the phase is printed on its own line if the console is not interactive) """
+        with self.lock:
+            self.statuses[name] = status
+            if not self.live:
+                if self.printed.get(name) != phase:
+                    self.printed[name] = phase
+                    print(f"[{name}] {status}", flush=True)
+                return
+            if time.monotonic() - self.last_render >= status_interval:
+                self.clear()
+                self.render()
+
+    def remove_status(self, name):
+        """ Remove the status of a build that completed """
+        with self.lock:
+            self.statuses.pop(name, None)
+            self.printed.pop(name, None)
+            self.clear()
+            self.render()
+
+    def clear(self):
+        """ Clear the status line (must be called while holding the lock) """
+        if self.visible:
+            sys.stdout.write("\r\x1b[K")
+            self.visible = False
+
+    def render(self):
+        """ Write the status of every running build on a single line (must be called while holding the lock) """
+        if not self.live or not self.statuses:
+            return
+        width = shutil.get_terminal_size().columns - 1
+        line = " | ".join(f"{name}: {status}" for name, status in self.statuses.items())
+        sys.stdout.write(line if len(line) <= width else line[:width - 3] + "...")
+        sys.stdout.flush()
+        self.visible = True
+        self.last_render = time.monotonic()
+
+console = Console()
@@ -0,0 +1,232 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import json
+import math
+import mmap
+import zlib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.cache import get_files
+from modules.checksum import hash_file
+from modules.console import console
+from modules.instrumentation import instrumentation
+from modules.staging import format_size
+
+small_anchor = b"\x9f"
+large_anchor = b"\x9f\x53"
+window_size = 32
+compress_batch_size = 64
+save_lock = threading.Lock()
+
+
+class ContentStore:
+    """ Split artifacts into content-defined chunks so identical data is only stored and downloaded once """
+    path = ""
+    average_size = 0
+    compression_level = 6
+    store_extensions = []
+    reuse = False
+    threads = 0
+    index = {}
+    files = {}
+
+    def __init__(self, path, average_size, compression_level, store_extensions, reuse, threads=0):
+        self.path = path
+        self.average_size = average_size
+        self.compression_level = max(1, min(compression_level, 9))
+        self.store_extensions = store_extensions
+        self.reuse = reuse
+        self.threads = threads
+        self.lock = threading.Lock()
+        self.index = load_json(os.path.join(path, "index.json"))
+        self.files = load_json(os.path.join(path, "files.json"))
+
+    def create(self, artifacts, pack_path):
+        """ Write a manifest for every artifact and the pack containing the chunks not stored in a previous pack """
+        with instrumentation.measure(f"Deduplicate {os.path.basename(pack_path)}", "dedup") as measurement:
+            pack_name = os.path.basename(pack_path)
+            index = { key: value for key, value in self.index.items() if value[0] != pack_name } if self.reuse else {}
+            written = {}
+            referenced = set()
+            manifests = []
+            total_size = 0
+            temp_pack = pack_path + ".tmp"
+            with open(temp_pack, mode="wb") as pack_file, ThreadPoolExecutor(max_workers=self.threads or None) as executor:
+                for artifact in artifacts:
+                    manifest = { "name": os.path.basename(artifact), "chunk_size": self.average_size,
+                                 "packs": [], "chunks": {}, "files": [], "directories": [] }
+                    for directory, directories, file_names in os.walk(artifact):
+                        if not directories and not file_names and directory != artifact:
+                            manifest["directories"].append(os.path.relpath(directory, artifact).replace(os.sep, "/"))
+                    for file in get_files(artifact):
+                        chunks = self.get_chunks(file)
+                        total_size += os.path.getsize(file)
+                        new_chunks = [chunk for chunk in chunks if chunk[0] not in index and chunk[0] not in written]
+                        self.write_chunks(file, new_chunks, pack_name, pack_file, written, executor)
+                        for chunk_hash, _, _ in chunks:
+                            referenced.add(chunk_hash)
+                            location = written.get(chunk_hash) or index[chunk_hash]
+                            if location[0] not in manifest["packs"]:
+                                manifest["packs"].append(location[0])
+                            manifest["chunks"][chunk_hash] = [manifest["packs"].index(location[0])] + location[1:]
+                        manifest["files"].append({ "path": os.path.relpath(file, artifact).replace(os.sep, "/"),
+                                                   "size": os.path.getsize(file),
+                                                   "chunks": [chunk[0] for chunk in chunks] })
+                    manifest_path = get_manifest_path(artifact)
+                    save_json(manifest_path, manifest)
+                    manifests.append(manifest_path)
+                pack_size = pack_file.tell()
+            if written:
+                os.replace(temp_pack, pack_path)
+            else:
+                os.remove(temp_pack)
+                if os.path.exists(pack_path):
+                    os.remove(pack_path)
+            self.save(pack_name, written)
+            measurement.bytes_written = pack_size
+            console.print(f"Deduplicated {len(artifacts)} artifact(s): {format_size(total_size)} stored as {len(written)} new "
+                          f"chunk(s) in {format_size(pack_size)} ({len(referenced) - len(written)} chunk(s) reused from previous packs)")
+        return ([pack_path] if written else []) + manifests
+
+    def get_chunks(self, path):
+        """ Get the hash, offset and size of the chunks of a file (files that were chunked before are not read again) """
+        key = f"{hash_file(path)}:{self.average_size}"
+        with self.lock:
+            if key in self.files:
+                offset = 0
+                chunks = []
+                for chunk_hash, size in self.files[key]:
+                    chunks.append((chunk_hash, offset, size))
+                    offset += size
+                return chunks
+        chunks = []
+        with open(path, mode="rb") as file:
+            for offset, size in get_boundaries(path, self.average_size):
+                file.seek(offset)
+                chunks.append((hashlib.sha256(file.read(size)).hexdigest(), offset, size))
+        with self.lock:
+            self.files[key] = [[chunk_hash, size] for chunk_hash, _, size in chunks]
+        return chunks
+
+    def write_chunks(self, path, chunks, pack_name, pack_file, written, executor):
+        """ Compress the chunks of a file and append them to the pack """
+        compress = not path.lower().endswith(tuple(self.store_extensions))
+        with open(path, mode="rb") as file:
+            for start in range(0, len(chunks), compress_batch_size):
+                batch = []
+                for chunk_hash, offset, size in chunks[start:start + compress_batch_size]:
+                    if chunk_hash in written:
+                        continue
+                    file.seek(offset)
+                    batch.append((chunk_hash, size, file.read(size)))
+                    written[chunk_hash] = None
+                data = executor.map(lambda chunk: compress_chunk(chunk[2], self.compression_level if compress else 0), batch)
+                for (chunk_hash, size, _), (stored, compressed) in zip(batch, data):
+                    written[chunk_hash] = [pack_name, pack_file.tell(), len(stored), size, compressed]
+                    pack_file.write(stored)
+
+    def save(self, pack_name, written):
+        """ Save the location of the chunks stored in the pack and the chunks of every file for the next release """
+        with save_lock:
+            os.makedirs(self.path, exist_ok=True)
+            index = load_json(os.path.join(self.path, "index.json"))
+            self.index = { key: value for key, value in index.items() if value[0] != pack_name }
+            self.index.update(written)
+            with self.lock:
+                self.files = { **load_json(os.path.join(self.path, "files.json")), **self.files }
+            save_json(os.path.join(self.path, "index.json"), self.index)
+            save_json(os.path.join(self.path, "files.json"), self.files)
+
+
+def get_boundaries(path, average_size):
+    """ Get the offset and size of every content-defined chunk of a file (boundaries only depend on the nearby bytes) """
+    file_size = os.path.getsize(path)
+    if file_size == 0:
+        return []
+    min_size = average_size // 4
+    max_size = average_size * 4
+    anchor = large_anchor if average_size >= 256 * 1024 else small_anchor
+    mask = (1 << max(round(math.log2((average_size - min_size) / 256 ** len(anchor))), 0)) - 1
+    boundaries = []
+    with open(path, mode="rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < file_size:
+            end = find_boundary(data, anchor, mask, start + min_size, min(start + max_size, file_size))
+            boundaries.append((start, end - start))
+            start = end
+    return boundaries
+
+def find_boundary(data, anchor, mask, position, end):
+    """ Find the first anchor of which the checksum of the preceding window matches the mask (the end is used if none is found) """
+    while position < end:
+        position = data.find(anchor, position, end)
+        if position < 0:
+            break
+        position += len(anchor)
+        if zlib.crc32(data[max(position - window_size, 0):position]) & mask == 0:
+            return position
+    return end
+
+def compress_chunk(data, level):
+    """ Compress a chunk (the chunk is stored as is if compression does not make it smaller) """
+    if level > 0:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            return compressed, 1
+    return data, 0
+
+def restore_artifact(manifest_path, destination):
+    """ Rebuild an artifact using its manifest and the packs in the same directory as the manifest """
+    if not os.path.exists(manifest_path):
+        raise Exception(f"Content manifest {manifest_path} could not be found")
+    manifest = load_json(manifest_path)
+    if "files" not in manifest:
+        raise Exception(f"Invalid content manifest {manifest_path}")
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    packs = [os.path.join(directory, pack) for pack in manifest["packs"]]
+    for pack in packs:
+        if not os.path.exists(pack):
+            raise Exception(f"Content pack {os.path.basename(pack)} could not be found. Download it to {directory}")
+    output = os.path.join(destination, manifest["name"])
+    print(f"Restoring {manifest['name']} to {output}")
+    pack_files = [open(pack, mode="rb") for pack in packs]
+    try:
+        for empty_directory in manifest["directories"]:
+            os.makedirs(os.path.join(output, empty_directory), exist_ok=True)
+        for file in manifest["files"]:
+            path = os.path.join(output, *file["path"].split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, mode="wb") as output_file:
+                for chunk_hash in file["chunks"]:
+                    pack, offset, stored_size, _, compressed = manifest["chunks"][chunk_hash]
+                    pack_files[pack].seek(offset)
+                    data = pack_files[pack].read(stored_size)
+                    if compressed:
+                        data = zlib.decompress(data)
+                    if hashlib.sha256(data).hexdigest() != chunk_hash:
+                        raise Exception(f"Chunk {chunk_hash} of {file['path']} is corrupted")
+                    output_file.write(data)
+    finally:
+        for pack_file in pack_files:
+            pack_file.close()
+    print(f"Restored {len(manifest['files'])} file(s)")
+
+def get_manifest_path(artifact):
+    """ Get the path to the content manifest of an artifact """
+    return f"{artifact}.manifest.json"
+
+def load_json(path):
+    """ Load a JSON file (an empty dictionary is returned if the file does not exist) """
+    if not os.path.exists(path):
+        return {}
+    with open(path, mode="r") as json_file:
+        return json.load(json_file)
+
+def save_json(path, data):
+    """ Save a JSON file by replacing the previous file once it is completely written """
+    with open(path + ".tmp", mode="w") as json_file:
+        json.dump(data, json_file, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,505 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hmac
+import socket
+import zipfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from modules.archive import Archiver, extract_archive
+from modules.cache import get_files
+from modules.watcher import ignored_directories
+from modules.console import console
+from modules.instrumentation import instrumentation
+from modules.packager import Packager
+from modules.plugin import Plugin
+from modules.runner import Progress
+from modules.staging import stager
+
+chunk_size = 1024 * 1024
+token_header = "X-UnrealPackager-Token"
+worker_header = "X-UnrealPackager-Worker"
+
+
+class Job:
+    """ Class containing information about a build job handed out to the workers """
+    id = ""
+    unreal_version = ""
+    visual_studio = ""
+    plugin_file = ""
+    source = ""
+    archive = ""
+    archiver = None
+    packager = None
+    status = "Pending"
+    worker = None
+    queued = 0.0
+    last_seen = 0.0
+    error = None
+
+    def __init__(self, unreal_version, visual_studio, plugin_file, source, archive, archiver, packager):
+        self.id = uuid.uuid4().hex
+        self.unreal_version = unreal_version
+        self.visual_studio = visual_studio
+        self.plugin_file = plugin_file
+        self.source = source
+        self.archive = archive
+        self.archiver = archiver
+        self.packager = packager
+        self.queued = time.monotonic()
+
+    def to_dict(self):
+        """ Get the job as a dictionary sent to the worker """
+        return {
+            "id": self.id,
+            "unreal_version": self.unreal_version,
+            "visual_studio": self.visual_studio,
+            "plugin": self.plugin_file,
+            "archive_format": self.archiver.archive_format,
+            "compression_level": self.archiver.compression_level,
+            "store_extensions": self.archiver.store_extensions
+        }
+
+
+class Coordinator:
+    """ Hand out plugin build jobs to the workers and receive their logs and archives """
+    host = ""
+    port = 0
+    token = ""
+    job_timeout = 0
+    work_dir = ""
+    jobs = {}
+    workers = {}
+    sources = {}
+    server = None
+
+    def __init__(self, host, port, token, job_timeout, work_dir):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.job_timeout = job_timeout
+        self.work_dir = work_dir
+        self.jobs = {}
+        self.workers = {}
+        self.sources = {}
+        self.condition = threading.Condition()
+        self.source_lock = threading.Lock()
+
+    def start(self):
+        """ Start the HTTP server used by the workers (only the first call starts the server) """
+        with self.condition:
+            if self.server is not None:
+                return
+            self.server = ThreadingHTTPServer((self.host, self.port), CoordinatorHandler)
+            self.server.daemon_threads = True
+            self.server.coordinator = self
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Coordinator listening on {self.host}:{self.port}")
+
+    def stop(self):
+        """ Stop the HTTP server used by the workers """
+        with self.condition:
+            server = self.server
+            self.server = None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    def clear_sources(self):
+        """ Remove the plugin source archives so they are created again from the current sources """
+        with self.source_lock:
+            for source in self.sources.values():
+                if os.path.exists(source):
+                    os.remove(source)
+            self.sources = {}
+
+    def run_job(self, packager, plugin, visual_studio, archive):
+        """ Queue a plugin build and wait until a worker returned the archive """
+        self.start()
+        job = Job(packager.unreal_version, visual_studio, os.path.basename(plugin.path),
+                  self.get_source(plugin), archive, packager.archiver, packager)
+        packager.log(f"Waiting for a worker with Unreal Engine {job.unreal_version}")
+        with instrumentation.measure(f"Remote {packager.log_prefix}".strip(), "remote") as measurement:
+            with self.condition:
+                self.jobs[job.id] = job
+                self.condition.notify_all()
+                while job.status in ["Pending", "Running"]:
+                    self.condition.wait(1)
+                    if job.status == "Running" and time.monotonic() - job.last_seen > self.job_timeout:
+                        packager.log(f"Worker {job.worker} stopped responding. Queueing the build again")
+                        job.status = "Pending"
+                        job.worker = None
+                        job.queued = time.monotonic()
+                    elif job.status == "Pending" and time.monotonic() - job.queued > self.job_timeout \
+                            and not self.has_worker(job.unreal_version):
+                        job.status = "Failed"
+                        job.error = f"No worker with Unreal Engine {job.unreal_version} asked for a build within {self.job_timeout} second(s)"
+                del self.jobs[job.id]
+            if job.status == "Failed":
+                measurement.status = "Failed"
+                if job.worker is None:
+                    raise Exception(job.error)
+                raise Exception(f"Worker {job.worker} failed to package the plugin: {job.error}")
+
+    def get_source(self, plugin):
+        """ Get the archive containing the plugin sources sent to the workers (created once per run) """
+        with self.source_lock:
+            if plugin.path in self.sources:
+                return self.sources[plugin.path]
+            os.makedirs(self.work_dir, exist_ok=True)
+            source = os.path.join(self.work_dir, f"{os.path.splitext(os.path.basename(plugin.path))[0]}-source.zip")
+            directory = os.path.dirname(plugin.path)
+            with zipfile.ZipFile(source, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as source_file:
+                for path in plugin.getsourcepaths():
+                    for file in get_files(path, ignored_directories):
+                        source_file.write(file, os.path.relpath(file, directory))
+            self.sources[plugin.path] = source
+            return source
+
+    def assign_job(self, worker, versions):
+        """ Assign the first pending job that can be built by the worker """
+        with self.condition:
+            self.workers[worker] = (versions, time.monotonic())
+            for job in self.jobs.values():
+                if job.status == "Pending" and job.unreal_version in versions:
+                    job.status = "Running"
+                    job.worker = worker
+                    job.last_seen = time.monotonic()
+                    job.packager.log(f"Building on worker {worker}")
+                    return job
+        return None
+
+    def has_worker(self, unreal_version):
+        """ Check if a worker offering the Unreal Engine version asked for a build recently (busy workers are included) """
+        return any(unreal_version in versions and time.monotonic() - last_seen <= self.job_timeout
+                   for versions, last_seen in self.workers.values())
+
+    def get_job(self, job_id, worker):
+        """ Get a running job assigned to the worker and update the time the worker was last seen """
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "Running" or job.worker != worker:
+                return None
+            job.last_seen = time.monotonic()
+            if worker in self.workers:
+                self.workers[worker] = (self.workers[worker][0], job.last_seen)
+            return job
+
+    def complete_job(self, job, status, error=None):
+        """ Mark the job as completed and wake up the stage waiting for it """
+        with self.condition:
+            job.status = status
+            job.error = error
+            self.condition.notify_all()
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    """ Handle the requests sent by the workers """
+
+    def do_GET(self):
+        """ Send the plugin sources of a job """
+        job = self.get_job(r"/jobs/(\w+)/source")
+        if job is None:
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(os.path.getsize(job.source)))
+        self.end_headers()
+        with open(job.source, mode="rb") as source_file:
+            shutil.copyfileobj(source_file, self.wfile, chunk_size)
+
+    def do_POST(self):
+        """ Handle a poll for a new job, log lines and output or a failed job """
+        if not self.is_authorized():
+            return
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path == "/jobs/next":
+            job = self.server.coordinator.assign_job(self.headers.get(worker_header, ""), data.get("versions", []))
+            if job is None:
+                self.send_json(204)
+            else:
+                self.send_json(200, job.to_dict())
+            return
+        job = self.get_job(r"/jobs/(\w+)/(log|fail)")
+        if job is None:
+            return
+        for line in data.get("lines", []):
+            job.packager.log(line)
+        for line in data.get("output", []):
+            job.packager.handle_output(line)
+        if self.path.endswith("/fail"):
+            self.server.coordinator.complete_job(job, "Failed", data.get("error"))
+        self.send_json(200)
+
+    def do_PUT(self):
+        """ Receive the archive created by the worker """
+        job = self.get_job(r"/jobs/(\w+)/artifact")
+        if job is None:
+            return
+        remaining = int(self.headers.get("Content-Length", 0))
+        temp_archive = job.archive + ".part"
+        os.makedirs(os.path.dirname(job.archive), exist_ok=True)
+        with open(temp_archive, mode="wb") as archive_file:
+            while remaining > 0:
+                data = self.rfile.read(min(chunk_size, remaining))
+                if not data:
+                    break
+                archive_file.write(data)
+                remaining -= len(data)
+        if remaining > 0:
+            os.remove(temp_archive)
+            self.send_json(400)
+            return
+        stager.move(temp_archive, job.archive)
+        self.server.coordinator.complete_job(job, "Succeeded")
+        self.send_json(200)
+
+    def get_job(self, pattern):
+        """ Get the job referenced by the path (an error is sent if the job is not assigned to the worker) """
+        if not self.is_authorized():
+            return None
+        match = re.fullmatch(pattern, self.path)
+        job = self.server.coordinator.get_job(match.group(1), self.headers.get(worker_header, "")) if match else None
+        if job is None:
+            self.send_json(404 if match is None else 409)
+        return job
+
+    def is_authorized(self):
+        """ Check the token sent by the worker (an error is sent if the token is invalid) """
+        token = self.server.coordinator.token
+        if token and hmac.compare_digest(self.headers.get(token_header, "").encode(), token.encode()):
+            return True
+        self.send_json(401)
+        return False
+
+    def send_json(self, status, data=None):
+        """ Send a response with an optional JSON body """
+        body = json.dumps(data).encode() if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Disable the default request logging """
+
+
+class RemotePackager(Packager):
+    """ Package the plugin on a worker instead of running RunUAT locally """
+    coordinator = None
+    plugin = None
+    visual_studio = ""
+    log_file = None
+    progress = None
+
+    def __init__(self, coordinator, unreal_install_dir, unreal_version, log_prefix="", cache=None, archiver=None,
+                 manifest=None, runner=None):
+        super().__init__(unreal_install_dir, unreal_version, log_prefix, cache, archiver, manifest, runner)
+        self.coordinator = coordinator
+        self.output_lock = threading.Lock()
+
+    def package_plugin(self, plugin, visual_studio):
+        """ Package the plugin using one of the workers """
+        self.plugin = plugin
+        self.visual_studio = visual_studio
+        super().package_plugin(plugin, visual_studio)
+
+    def package_project(self, project, platform):
+        """ Projects are not supported by the workers """
+        raise Exception("Projects can not be packaged by distributed workers")
+
+    def run_build(self, name, output, archive, command):
+        """ Let a worker build and archive the plugin and extract the archive it returned """
+        log_name = self.get_log_name(name)
+        with self.runner.open_log(log_name) as log_file:
+            with self.output_lock:
+                self.log_file = log_file
+                self.progress = Progress(self.runner.max_errors)
+            try:
+                self.coordinator.run_job(self, self.plugin, self.visual_studio, archive)
+            finally:
+                with self.output_lock:
+                    self.log_file = None
+                console.remove_status(self.log_prefix or log_name)
+                if self.runner.get_log_path(log_name) is not None:
+                    self.log(f"Log saved to {self.runner.get_log_path(log_name)}")
+        self.log(f"Received archive : {archive}")
+        extract_archive(archive, output)
+
+    def handle_output(self, line):
+        """ Write the output streamed by the worker to the log and show the progress """
+        with self.output_lock:
+            if self.log_file is None:
+                return
+            self.log_file.write(line + "\n")
+            self.progress.parse(line)
+            console.set_status(self.log_prefix, self.progress.phase, self.progress.get_status())
+        super().handle_output(line)
+
+
+class WorkerPackager(Packager):
+    """ Package the plugin on a worker and keep the log lines and output so they can be sent to the coordinator """
+    lines = []
+    output = []
+
+    def __init__(self, unreal_install_dir, unreal_version, log_prefix="", archiver=None, runner=None):
+        super().__init__(unreal_install_dir, unreal_version, log_prefix, archiver=archiver, runner=runner)
+        self.lines = []
+        self.output = []
+        self.lines_lock = threading.Lock()
+
+    def log(self, message):
+        """ Print the message and keep it until it is sent to the coordinator """
+        super().log(message)
+        with self.lines_lock:
+            self.lines.append(message)
+
+    def handle_output(self, line):
+        """ Keep the output of the command until it is sent to the coordinator """
+        super().handle_output(line)
+        with self.lines_lock:
+            self.output.append(line)
+
+    def take_lines(self):
+        """ Get the log lines and output that were not sent to the coordinator yet """
+        with self.lines_lock:
+            data = { "lines": self.lines, "output": self.output }
+            self.lines = []
+            self.output = []
+        return data
+
+    def restore_lines(self, data):
+        """ Add log lines and output that could not be sent back to the start of the queue """
+        with self.lines_lock:
+            self.lines = data["lines"] + self.lines
+            self.output = data["output"] + self.output
+
+
+class Worker:
+    """ Pull build jobs from the coordinator and build them using the installed Unreal Engine versions """
+    url = ""
+    name = ""
+    unreal_install_dir = ""
+    token = ""
+    work_dir = ""
+    archive_threads = 0
+    runner = None
+    poll_interval = 2.0
+    log_interval = 1.0
+
+    def __init__(self, url, name, unreal_install_dir, token, work_dir, archive_threads=0, runner=None):
+        self.url = url.rstrip("/")
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.unreal_install_dir = unreal_install_dir
+        self.token = token
+        self.work_dir = work_dir
+        self.archive_threads = archive_threads
+        self.runner = runner
+
+    def run(self):
+        """ Keep polling the coordinator for new jobs """
+        versions = self.get_versions()
+        if not versions:
+            raise Exception(f"No Unreal Engine versions found in {self.unreal_install_dir}")
+        print(f"Worker {self.name} is offering Unreal Engine {', '.join(versions)} to {self.url}")
+        delay = self.poll_interval
+        while True:
+            try:
+                job = self.request("POST", "/jobs/next", { "versions": versions })
+                delay = self.poll_interval
+            except OSError as error:
+                print(f"Failed to reach the coordinator ({error}). Retrying in {int(delay)} seconds")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+            if job is None:
+                time.sleep(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def get_versions(self):
+        """ Get the Unreal Engine versions that are installed on this machine """
+        versions = []
+        if os.path.isdir(self.unreal_install_dir):
+            for name in sorted(os.listdir(self.unreal_install_dir)):
+                if name.startswith("UE_"):
+                    packager = Packager(self.unreal_install_dir, name[3:])
+                    if os.path.exists(packager.get_uat_script()):
+                        versions.append(name[3:])
+        return versions
+
+    def run_job(self, job):
+        """ Download the sources, build the plugin and send the archive to the coordinator """
+        directory = os.path.join(self.work_dir, job["id"])
+        source = os.path.join(directory, "source")
+        os.makedirs(source, exist_ok=True)
+        archiver = Archiver(job["archive_format"], job["compression_level"], job["store_extensions"], self.archive_threads)
+        packager = WorkerPackager(self.unreal_install_dir, job["unreal_version"], f"UE{job['unreal_version']}",
+                                  archiver, self.runner)
+        stopped = threading.Event()
+        thread = threading.Thread(target=self.send_logs, args=(job, packager, stopped), daemon=True)
+        thread.start()
+        try:
+            self.download(f"/jobs/{job['id']}/source", os.path.join(directory, "source.zip"))
+            extract_archive(os.path.join(directory, "source.zip"), source)
+            plugin = Plugin(os.path.join(source, job["plugin"]), os.path.join(directory, "output"))
+            packager.package_plugin(plugin, job["visual_studio"])
+            stopped.set()
+            thread.join()
+            self.request("POST", f"/jobs/{job['id']}/log", packager.take_lines())
+            self.upload(f"/jobs/{job['id']}/artifact", plugin.getbuildpath(job["unreal_version"]) + archiver.get_extension())
+        except Exception as error:
+            stopped.set()
+            thread.join()
+            packager.log(f"Error: {error}")
+            try:
+                self.request("POST", f"/jobs/{job['id']}/fail", dict(packager.take_lines(), error=str(error)))
+            except OSError:
+                pass
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def send_logs(self, job, packager, stopped):
+        """ Send the new log lines to the coordinator (this also lets the coordinator know the worker is still busy) """
+        while not stopped.wait(self.log_interval):
+            data = packager.take_lines()
+            try:
+                self.request("POST", f"/jobs/{job['id']}/log", data)
+            except OSError:
+                packager.restore_lines(data)
+
+    def request(self, method, path, data):
+        """ Send a JSON request to the coordinator and get the JSON response (or None if there is no content) """
+        body = json.dumps(data).encode()
+        with self.open(method, path, body, { "Content-Type": "application/json" }) as response:
+            content = response.read()
+        return json.loads(content) if content else None
+
+    def download(self, path, destination):
+        """ Download a file from the coordinator """
+        with self.open("GET", path) as response, open(destination, mode="wb") as file:
+            shutil.copyfileobj(response, file, chunk_size)
+
+    def upload(self, path, file_path):
+        """ Stream a file to the coordinator """
+        headers = { "Content-Type": "application/octet-stream", "Content-Length": str(os.path.getsize(file_path)) }
+        with open(file_path, mode="rb") as file:
+            self.open("PUT", path, file, headers).close()
+
+    def open(self, method, path, data=None, headers=None):
+        """ Send a request to the coordinator including the token and the name of the worker """
+        headers = dict(headers or {})
+        headers[worker_header] = self.name
+        if self.token:
+            headers[token_header] = self.token
+        request = urllib.request.Request(self.url + path, data=data, headers=headers, method=method)
+        return urllib.request.urlopen(request, timeout=60)
@@ -0,0 +1,218 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.checksum import hash_file
+from modules.console import console
+from modules.instrumentation import instrumentation
+
+connect_timeout = 10
+read_timeout = 120
+
+
+class GitHub:
+    """ Class used to create releases and upload release assets using the GitHub API """
+    api_url = ""
+    owner = ""
+    repo = ""
+    token = ""
+    upload_threads = 1
+    retries = 0
+    release = None
+    assets = {}
+
+    def __init__(self, api_url, owner, repo, token, upload_threads=4, retries=5):
+        # requests is only imported when a release is created since it adds a noticeable delay to the startup time
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.api_url = api_url.rstrip("/")
+        self.owner = owner
+        self.repo = repo
+        self.token = token
+        self.upload_threads = max(1, upload_threads)
+        self.retries = retries
+        self.request_error = requests.exceptions.RequestException
+        self.release = None
+        self.assets = {}
+        self.uploaded = set()
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.upload_threads + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            'Accept' : 'application/vnd.github+json',
+            'Authorization' : f'Bearer {self.token}',
+            'X-GitHub-Api-Version': '2022-11-28'
+        })
+
+    def request(self, method, url, get_data=None, **kwargs):
+        """ Send a request to the GitHub API and retry with an exponential backoff if it fails or stalls (client errors are returned) """
+        for attempt in range(self.retries + 1):
+            data = get_data() if get_data is not None else None
+            try:
+                response = self.session.request(method, url, data=data, timeout=(connect_timeout, read_timeout), **kwargs)
+                if response.status_code < 500 and response.status_code != 429:
+                    return response
+                error = f"{response.status_code} {response.reason}"
+            except self.request_error as exception:
+                error = str(exception)
+            finally:
+                if hasattr(data, "close"):
+                    data.close()
+            if attempt < self.retries:
+                delay = 2 ** attempt
+                self.log(f"Request to {url} failed ({error}). Retrying in {delay} second(s)")
+                time.sleep(delay)
+        raise Exception(f"Request to {url} failed after {self.retries + 1} attempt(s): {error}")
+
+    def create_release(self, data):
+        """ Create a new draft release (or resume the existing release if the tag was already released) """
+        url = f"{self.api_url}/repos/{self.owner}/{self.repo}/releases"
+        self.release = self.find_release(data["tag_name"])
+        if self.release is None:
+            response = self.request("POST", url, lambda: json.dumps({ **data, "draft": True }))
+            if not response.ok:
+                self.log(response.content)
+                raise Exception("Failed to create new release on Github")
+            self.release = response.json()
+        self.assets = { asset["name"]: asset for asset in self.get_assets() }
+        return self.release
+
+    def find_release(self, tag):
+        """ Find the release (including drafts) of a tag using the list of releases (or None if the tag was never released) """
+        page = 1
+        while True:
+            url = f"{self.api_url}/repos/{self.owner}/{self.repo}/releases"
+            response = self.request("GET", url, params={ "per_page": 100, "page": page })
+            if not response.ok:
+                self.log(response.content)
+                raise Exception("Failed to get the releases on Github")
+            for release in response.json():
+                if release["tag_name"] == tag:
+                    self.log(f"Release {tag} already exists. Resuming the existing release")
+                    return release
+            if len(response.json()) < 100:
+                return None
+            page += 1
+
+    def publish_release(self):
+        """ Publish the draft release once every asset was uploaded """
+        if not self.release.get("draft"):
+            return self.release
+        url = f"{self.api_url}/repos/{self.owner}/{self.repo}/releases/{self.release['id']}"
+        response = self.request("PATCH", url, lambda: json.dumps({ "draft": False }))
+        if not response.ok:
+            self.log(response.content)
+            raise Exception("Failed to publish the release on Github")
+        self.release = response.json()
+        return self.release
+
+    def get_assets(self):
+        """ Get all the assets already uploaded to the release """
+        assets = []
+        page = 1
+        while True:
+            url = f"{self.api_url}/repos/{self.owner}/{self.repo}/releases/{self.release['id']}/assets"
+            response = self.request("GET", url, params={ "per_page": 100, "page": page })
+            if not response.ok:
+                self.log(response.content)
+                raise Exception("Failed to get the assets of the release on Github")
+            assets.extend(response.json())
+            if len(response.json()) < 100:
+                return assets
+            page += 1
+
+    def upload_assets(self, files):
+        """ Upload the files to the release concurrently (skipping files that were already uploaded) """
+        with ThreadPoolExecutor(max_workers=self.upload_threads) as executor:
+            futures = [executor.submit(self.upload_asset, file_path) for file_path in files]
+            errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            raise errors[0]
+
+    def is_uploaded(self, file_path):
+        """ Check if a file was already uploaded during this run """
+        with self.lock:
+            return os.path.basename(file_path) in self.uploaded
+
+    def upload_asset(self, file_path):
+        """ Upload a single file to the release by streaming it from disk """
+        with instrumentation.measure(f"Upload {os.path.basename(file_path)}", "upload") as measurement:
+            asset = self.send_asset(file_path)
+            measurement.bytes_read = asset["size"]
+            return asset
+
+    def send_asset(self, file_path):
+        """ Send a file to GitHub (or skip it if it was already uploaded) """
+        file_name = os.path.basename(file_path)
+        size = os.path.getsize(file_path)
+        with self.lock:
+            self.uploaded.add(file_name)
+            existing_asset = self.assets.get(file_name)
+        if existing_asset is not None:
+            if existing_asset["state"] == "uploaded" and existing_asset["size"] == size and is_same_digest(existing_asset, file_path):
+                self.log(f"Skipping {file_name} (already uploaded)")
+                return existing_asset
+            self.log(f"Removing incomplete or outdated upload of {file_name}")
+            self.delete_asset(existing_asset)
+        self.log(f"Uploading {file_name}")
+        url = self.release["upload_url"].split("{")[0]
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Length': str(size)
+        }
+        response = self.request("POST", url, lambda: open(file_path, mode="rb"), params={ "name": file_name }, headers=headers)
+        if response.status_code == 422:
+            # An upload that timed out can leave a partial asset behind which has to be removed before trying again
+            partial_assets = [asset for asset in self.get_assets() if asset["name"] == file_name]
+            if partial_assets:
+                self.log(f"Removing incomplete upload of {file_name}")
+                self.delete_asset(partial_assets[0])
+                response = self.request("POST", url, lambda: open(file_path, mode="rb"), params={ "name": file_name },
+                                        headers=headers)
+        if not response.ok:
+            self.log(response.content)
+            raise Exception(f"Failed to upload {file_name}")
+        self.log(f"Uploaded {file_name}")
+        with self.lock:
+            self.assets[file_name] = response.json()
+        return self.assets[file_name]
+
+    def delete_asset(self, asset):
+        """ Remove an asset from the release """
+        url = f"{self.api_url}/repos/{self.owner}/{self.repo}/releases/assets/{asset['id']}"
+        response = self.request("DELETE", url)
+        if not response.ok and response.status_code != 404:
+            self.log(response.content)
+            raise Exception(f"Failed to remove {asset['name']}")
+
+    def verify_assets(self, checksums):
+        """ Compare the size and digest GitHub reports for every asset with the local checksums (returns the errors and the number of assets without a digest) """
+        assets = { asset["name"]: asset for asset in self.get_assets() }
+        errors = []
+        unverified = 0
+        for name, (size, digest) in checksums.items():
+            asset = assets.get(name)
+            if asset is None or asset["state"] != "uploaded":
+                errors.append(f"{name} was not uploaded")
+            elif asset["size"] != size:
+                errors.append(f"{name} has a size of {asset['size']} bytes on GitHub instead of {size} bytes")
+            elif not asset.get("digest"):
+                unverified += 1
+            elif asset["digest"] != f"sha256:{digest}":
+                errors.append(f"{name} has a digest of {asset['digest']} on GitHub instead of sha256:{digest}")
+        return errors, unverified
+
+    def log(self, message):
+        """ Print a message without interleaving the output of concurrent uploads """
+        console.print(message)
+
+
+def is_same_digest(asset, file_path):
+    """ Check if an uploaded asset has the same SHA-256 digest as the file (assets without a digest are only compared by size) """
+    return not asset.get("digest") or asset["digest"] == f"sha256:{hash_file(file_path)}"
@@ -0,0 +1,198 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import csv
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+sample_interval = 0.5
+
+
+class Measurement:
+    """ Class containing the timing and resource usage of a single stage or step """
+    name = ""
+    category = ""
+    stage = ""
+    start = 0.0
+    wall_time = 0.0
+    cpu_time = 0.0
+    process_cpu_time = 0.0
+    peak_rss = None
+    bytes_read = 0
+    bytes_written = 0
+    thread = 0
+    status = "Succeeded"
+    reused = False
+    categories = set()
+
+    def __init__(self, name, category, start):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.thread = threading.get_ident()
+        self.categories = set()
+
+    def add_child_usage(self, cpu_time, peak_rss, bytes_read, bytes_written):
+        """ Add the resource usage of a child process or nested step """
+        self.process_cpu_time += cpu_time
+        if peak_rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, peak_rss)
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+
+    def to_dict(self):
+        """ Get the measurement as a dictionary used in the reports """
+        return {
+            "name": self.name,
+            "category": self.category,
+            "status": self.status,
+            "start": round(self.start, 6),
+            "wall_time": round(self.wall_time, 6),
+            "cpu_time": round(self.cpu_time, 6),
+            "peak_rss": self.peak_rss,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written
+        }
+
+
+class Instrumentation:
+    """ Record the wall time, CPU time, memory and IO usage of every stage, build, archive and upload """
+    measurements = []
+
+    def __init__(self):
+        self.measurements = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def measure(self, name, category):
+        """ Measure the code executed inside the with statement """
+        measurement = Measurement(name, category, time.perf_counter() - self.start)
+        stack = self.get_stack()
+        parent = stack[-1] if stack else None
+        measurement.stage = stack[0].name if stack else name
+        stack.append(measurement)
+        thread_time = time.thread_time()
+        try:
+            yield measurement
+        except BaseException:
+            measurement.status = "Failed"
+            raise
+        finally:
+            stack.pop()
+            measurement.wall_time = time.perf_counter() - self.start - measurement.start
+            measurement.cpu_time = time.thread_time() - thread_time + measurement.process_cpu_time
+            if parent is not None:
+                parent.categories.update(measurement.categories | {measurement.category})
+                parent.add_child_usage(measurement.process_cpu_time, measurement.peak_rss,
+                                       measurement.bytes_read, measurement.bytes_written)
+            with self.lock:
+                self.measurements.append(measurement)
+
+    def add_bytes_read(self, size):
+        """ Add bytes read without a measurement of their own to the measurement active on this thread """
+        stack = self.get_stack()
+        if stack:
+            stack[-1].bytes_read += size
+
+    def mark_reused(self):
+        """ Mark the measurements active on this thread as reusing a previous result instead of doing the work """
+        for measurement in self.get_stack():
+            measurement.reused = True
+
+    def get_stack(self):
+        """ Get the measurements currently active on this thread """
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def watch(self, measurement, pid):
+        """ Sample the CPU time, memory and IO usage of a process and its children (requires psutil) """
+        try:
+            import psutil
+        except ImportError:
+            yield
+            return
+        usage = { "cpu_time": 0.0, "peak_rss": 0, "bytes_read": 0, "bytes_written": 0 }
+        stopped = threading.Event()
+        thread = threading.Thread(target=sample_process, args=(psutil, pid, usage, stopped), daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+            measurement.add_child_usage(usage["cpu_time"], usage["peak_rss"], usage["bytes_read"], usage["bytes_written"])
+
+    def write_report(self, directory, formats, trace, group=None):
+        """ Write the measurements to the report directory using the selected formats (only the stages of the group if specified) """
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            measurements = sorted(self.measurements, key=lambda measurement: measurement.start)
+        if group is not None:
+            measurements = [measurement for measurement in measurements if measurement.stage.startswith(f"{group}/")]
+        rows = [measurement.to_dict() for measurement in measurements]
+        if "json" in formats:
+            with open(os.path.join(directory, "report.json"), mode="w") as report_file:
+                json.dump({ "started": self.start_time, "measurements": rows }, report_file, indent=4)
+        if "csv" in formats:
+            with open(os.path.join(directory, "report.csv"), mode="w", newline="") as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=list(Measurement("", "", 0).to_dict()))
+                writer.writeheader()
+                writer.writerows(rows)
+        if trace:
+            threads = {}
+            events = []
+            for measurement in measurements:
+                events.append({
+                    "name": measurement.name,
+                    "cat": measurement.category,
+                    "ph": "X",
+                    "ts": int(measurement.start * 1000000),
+                    "dur": int(measurement.wall_time * 1000000),
+                    "pid": os.getpid(),
+                    "tid": threads.setdefault(measurement.thread, len(threads) + 1),
+                    "args": measurement.to_dict()
+                })
+            with open(os.path.join(directory, "trace.json"), mode="w") as trace_file:
+                json.dump({ "traceEvents": events, "displayTimeUnit": "ms" }, trace_file)
+        print(f"Report saved to {directory}")
+
+
+def sample_process(psutil, pid, usage, stopped):
+    """ Periodically sample a process and its children until the process exits """
+    try:
+        root = psutil.Process(pid)
+    except psutil.Error:
+        return
+    totals = {}
+    while True:
+        try:
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            processes = []
+        rss = 0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    cpu_times = process.cpu_times()
+                    rss += process.memory_info().rss
+                    io = process.io_counters() if hasattr(process, "io_counters") else None
+                totals[process.pid] = (cpu_times.user + cpu_times.system,
+                                       io.read_bytes if io else 0, io.write_bytes if io else 0)
+            except psutil.Error:
+                continue
+        usage["peak_rss"] = max(usage["peak_rss"], rss)
+        usage["cpu_time"] = sum(total[0] for total in totals.values())
+        usage["bytes_read"] = sum(total[1] for total in totals.values())
+        usage["bytes_written"] = sum(total[2] for total in totals.values())
+        if stopped.wait(sample_interval):
+            return
+
+instrumentation = Instrumentation()
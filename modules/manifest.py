@@ -0,0 +1,97 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import json
+import shutil
+import threading
+from modules.checksum import hash_file
+from modules.console import console
+from modules.instrumentation import instrumentation
+
+manifest_file_name = ".unrealpackager-manifest.json"
+
+
+class Manifest:
+    """ Record of the artifacts in the output directory and the inputs used to create them """
+    path = ""
+    output = ""
+    incremental = False
+    entries = {}
+
+    def __init__(self, output, incremental):
+        self.output = output
+        self.incremental = incremental
+        self.path = os.path.join(output, manifest_file_name)
+        self.entries = {}
+        self.used_stages = set()
+        self.lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, mode="r") as manifest_file:
+                self.entries = json.load(manifest_file).get("stages", {})
+
+    def is_up_to_date(self, stage, inputs):
+        """ Check if the artifacts of a stage exist and were created using the same inputs """
+        with self.lock:
+            self.used_stages.add(stage)
+            entry = self.entries.get(stage)
+        if not self.incremental or entry is None or entry["inputs"] != inputs:
+            return False
+        for name, artifact in entry["artifacts"].items():
+            path = os.path.join(self.output, name)
+            if artifact is None:
+                if not os.path.isdir(path):
+                    return False
+                continue
+            if not os.path.isfile(path):
+                return False
+            stat = os.stat(path)
+            if stat.st_size != artifact["size"]:
+                return False
+            if stat.st_mtime_ns != artifact["mtime"] and hash_file(path) != artifact["sha256"]:
+                return False
+        instrumentation.mark_reused()
+        return True
+
+    def record(self, stage, inputs, artifacts):
+        """ Record the artifacts created by a stage and remove the artifacts it no longer creates """
+        entry = { "inputs": inputs, "artifacts": {} }
+        for path in artifacts:
+            name = os.path.relpath(path, self.output)
+            if os.path.isdir(path):
+                entry["artifacts"][name] = None
+            else:
+                stat = os.stat(path)
+                entry["artifacts"][name] = { "size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": hash_file(path) }
+        with self.lock:
+            self.used_stages.add(stage)
+            previous = self.entries.get(stage)
+            self.entries[stage] = entry
+            if previous is not None:
+                self.remove_artifacts([name for name in previous["artifacts"] if name not in entry["artifacts"]])
+            self.save()
+
+    def prune(self):
+        """ Remove the entries and artifacts of stages that were not used during this run """
+        with self.lock:
+            for stage in [stage for stage in self.entries if stage not in self.used_stages]:
+                console.print(f"Removing stale artifacts of {stage}")
+                self.remove_artifacts(self.entries.pop(stage)["artifacts"])
+            self.save()
+
+    def remove_artifacts(self, names):
+        """ Remove artifacts from the output directory """
+        for name in names:
+            path = os.path.join(self.output, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def save(self):
+        """ Save the manifest to the output directory """
+        os.makedirs(self.output, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, mode="w") as manifest_file:
+            json.dump({ "stages": self.entries }, manifest_file, indent=4, sort_keys=True)
+        os.replace(temp_path, self.path)
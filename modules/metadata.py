@@ -0,0 +1,31 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import threading
+from modules.plugin import Plugin
+from modules.project import Project, getconfigpath
+
+descriptors = {}
+descriptors_lock = threading.Lock()
+
+def load_plugin(path, output):
+    """ Get the plugin (the uplugin file is only parsed again when it changed) """
+    return load_descriptor(Plugin, path, output, [path])
+
+def load_project(path, output):
+    """ Get the project (the uproject and config files are only parsed again when they changed) """
+    return load_descriptor(Project, path, output, [path, getconfigpath(path)])
+
+def load_descriptor(descriptor_type, path, output, files):
+    """ Get a cached plugin or project and invalidate it when the modification time of its files changed """
+    key = (descriptor_type.__name__, path, output)
+    modified = [os.stat(file).st_mtime_ns if os.path.exists(file) else None for file in files]
+    with descriptors_lock:
+        cached = descriptors.get(key)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+    descriptor = descriptor_type(path, output)
+    with descriptors_lock:
+        descriptors[key] = (modified, descriptor)
+    return descriptor
@@ -2,51 +2,179 @@
 # https://github.com/hfjooste/UnrealPackager
 
 import os
+import sys
 import shutil
-import subprocess
+import threading
+from modules.archive import Archiver
+from modules.cache import get_build_key
+from modules.console import console
+from modules.instrumentation import instrumentation
+from modules.runner import CommandRunner
 
 class Packager:
     """ Automate packaging an Unreal Engine projects and plugins """
     unreal_install_dir = ""
     unreal_version = ""
+    log_prefix = ""
+    cache = None
+    archiver = None
+    manifest = None
+    runner = None
+    shared_build = None
 
-    def __init__(self, unreal_install_dir, unreal_version):
+    def __init__(self, unreal_install_dir, unreal_version, log_prefix="", cache=None, archiver=None, manifest=None, runner=None,
+                 shared_build=None):
         self.unreal_install_dir = unreal_install_dir
         self.unreal_version = unreal_version
+        self.log_prefix = log_prefix
+        self.cache = cache
+        self.archiver = archiver or Archiver()
+        self.manifest = manifest
+        self.runner = runner or CommandRunner()
+        self.shared_build = shared_build
 
     def package_plugin(self, plugin, visual_studio):
         """ Package the plugin """
         output = plugin.getbuildpath(self.unreal_version)
-        print(f"\nPackaging plugin using Unreal Engine {self.unreal_version}")
-        print(f"Plugin : {plugin.path}")
-        print(f"Output : {output}")
-        if os.path.exists(output):
-            shutil.rmtree(output)
-        script = rf'{self.unreal_install_dir}\\UE_{self.unreal_version}\\Engine\\Build\\BatchFiles\\RunUAT.bat'
-        command = rf'"{script}" BuildPlugin -Plugin="{plugin.path}" -Package="{output}" -VS{visual_studio} -Rocket'
-        print(f"\nExecuting command : {command}\n")
-        result = subprocess.run(command)
-        if result.returncode != 0:
-            raise Exception(f"Failed to package plugin. Error code: {result.returncode}")
-        if os.path.exists(f"{output}.zip"):
-            os.remove(f"{output}.zip")
-        shutil.make_archive(output, "zip", output)
-            
+        self.log(f"Packaging plugin using Unreal Engine {self.unreal_version}")
+        self.log(f"Plugin : {plugin.path}")
+        self.log(f"Output : {output}")
+        command = rf'"{self.get_uat_script()}" BuildPlugin -Plugin="{plugin.path}" -Package="{output}" -VS{visual_studio} -Rocket'
+        self.build("plugin", f"plugin:{self.unreal_version}", output, plugin.getsourcepaths(), command)
 
     def package_project(self, project, platform):
         """ Package the project """
         output = project.getbuildpath(platform)
-        print(f"\nPackaging project using Unreal Engine {self.unreal_version}")
-        print(f"Project : {project.path}")
-        print(f"Output : {output}")
+        self.log(f"Packaging project using Unreal Engine {self.unreal_version}")
+        self.log(f"Project : {project.path}")
+        self.log(f"Output : {output}")
+        command = rf'"{self.get_uat_script()}" BuildCookRun -project="{project.path}" -targetplatform={platform} -cook -allmaps -build -stage -pak -archive -archivedirectory="{output}"'
+        if self.shared_build is not None:
+            command += " -nocompileeditor -iterate"
+        self.build("project", f"project:{platform}", output, project.getsourcepaths(), command)
+
+    def build(self, name, stage, output, sources, command):
+        """ Run the build command and archive the output (or restore it from the build cache) """
+        archive = output + self.archiver.get_extension()
+        engine_version = self.get_engine_version_path()
+        if os.path.exists(engine_version):
+            sources = sources + [engine_version]
+        key = get_build_key(sources, self.unreal_version, command.replace(output, "OUTPUT"), self.archiver.archive_format,
+                            self.archiver.compression_level, self.archiver.store_extensions)
+        if self.manifest is not None and self.manifest.is_up_to_date(stage, key):
+            self.log(f"The {name} is up to date")
+            return
         if os.path.exists(output):
             shutil.rmtree(output)
-        script = rf'{self.unreal_install_dir}\\UE_{self.unreal_version}\\Engine\\Build\\BatchFiles\\RunUAT.bat'
-        command = rf'"{script}" BuildCookRun -project="{project.path}" -targetplatform={platform} -cook -allmaps -build -stage -pak -archive -archivedirectory="{output}"'
-        print(f"\nExecuting command : {command}\n")
-        result = subprocess.run(command)
-        if result.returncode != 0:
-            raise Exception(f"Failed to package project. Error code: {result.returncode}")
-        if os.path.exists(f"{output}.zip"):
-            os.remove(f"{output}.zip")
-        shutil.make_archive(output, "zip", output)
+        if self.cache is not None and self.cache.restore(key, archive, output):
+            self.log(f"Restored {name} from the build cache")
+        else:
+            self.run_build(name, output, archive, command)
+            if self.cache is not None:
+                self.cache.store(key, archive)
+        if self.manifest is not None:
+            self.manifest.record(stage, key, [output, archive])
+
+    def run_build(self, name, output, archive, command):
+        """ Run the build command and create the archive of the output """
+        if self.shared_build is not None:
+            self.shared_build.prepare(self)
+        returncode = self.run_command(command, self.get_log_name(name))
+        if returncode != 0:
+            raise Exception(f"Failed to package {name}. Error code: {returncode}")
+        self.log(f"Creating archive : {archive}")
+        self.archiver.create(output, archive)
+
+    def get_log_name(self, name):
+        """ Get the name of the log file of the build """
+        return f"{name}-{self.log_prefix.replace('/', '-')}" if self.log_prefix else name
+
+    def get_uat_script(self):
+        """ Get the path to the RunUAT script of the Unreal Engine version """
+        script = "RunUAT.bat" if os.name == "nt" else "RunUAT.sh"
+        return os.path.join(self.unreal_install_dir, f"UE_{self.unreal_version}", "Engine", "Build", "BatchFiles", script)
+
+    def get_engine_version_path(self):
+        """ Get the path to the file containing the exact version of the engine (used so an engine update invalidates the builds) """
+        return os.path.join(self.unreal_install_dir, f"UE_{self.unreal_version}", "Engine", "Build", "Build.version")
+
+    def get_editor_cmd(self):
+        """ Get the path to the command-line editor of the Unreal Engine version """
+        name = "UE4Editor-Cmd" if self.unreal_version.startswith("4.") else "UnrealEditor-Cmd"
+        if os.name == "nt":
+            return os.path.join(self.unreal_install_dir, f"UE_{self.unreal_version}", "Engine", "Binaries", "Win64", f"{name}.exe")
+        host = "Mac" if sys.platform == "darwin" else "Linux"
+        return os.path.join(self.unreal_install_dir, f"UE_{self.unreal_version}", "Engine", "Binaries", host, name)
+
+    def get_environment(self):
+        """ Get the environment variables added to the build commands (the local DerivedDataCache is moved to the shared cache if enabled) """
+        if self.shared_build is None:
+            return None
+        return { "UE-LocalDataCachePath": self.shared_build.ddc_path }
+
+    def run_command(self, command, log_name):
+        """ Run a command and write the output to the log while showing the progress """
+        self.log(f"Executing command : {command}")
+        with instrumentation.measure(f"RunUAT {self.log_prefix}".strip(), "uat") as measurement:
+            returncode, progress = self.runner.run(command, log_name, self.log_prefix or log_name, self.handle_output, measurement,
+                                                   self.get_environment())
+            if returncode != 0:
+                measurement.status = "Failed"
+        log_path = self.runner.get_log_path(log_name)
+        if log_path is not None:
+            self.log(f"Log saved to {log_path}")
+        if progress.ddc_hits + progress.ddc_misses > 0:
+            self.log(f"DDC hit rate : {progress.get_ddc_hit_rate():.1f}% ({progress.ddc_hits} hit(s), {progress.ddc_misses} miss(es))")
+        if returncode != 0 and progress.errors:
+            self.log(f"First {len(progress.errors)} of {progress.error_count} error(s):")
+            for error in progress.errors:
+                self.log(f"    {error}")
+        return returncode
+
+    def handle_output(self, line):
+        """ Handle a line of the command output (only printed if the output should be echoed) """
+        if self.runner.echo:
+            self.log(line)
+
+    def log(self, message):
+        """ Print a message with the log prefix """
+        console.print(f"[{self.log_prefix}] {message}" if self.log_prefix else message)
+
+
+class SharedProjectBuild:
+    """ Build the editor and fill the shared DerivedDataCache once so every platform only has to build, cook, stage and pak """
+    project = None
+    platforms = []
+    ddc_path = ""
+    prepared = False
+    error = None
+
+    def __init__(self, project, platforms, ddc_path):
+        self.project = project
+        self.platforms = platforms
+        self.ddc_path = ddc_path
+        self.lock = threading.Lock()
+
+    def prepare(self, packager):
+        """ Run the platform-independent steps using the first packager that needs them (the other packagers wait until they are done) """
+        with self.lock:
+            if self.error is not None:
+                raise Exception(f"The shared project build failed: {self.error}")
+            if self.prepared:
+                return
+            try:
+                packager.log(f"Preparing shared project build (DerivedDataCache: {self.ddc_path})")
+                os.makedirs(self.ddc_path, exist_ok=True)
+                command = rf'"{packager.get_uat_script()}" BuildEditor -project="{self.project.path}"'
+                if packager.run_command(command, packager.get_log_name("editor")) != 0:
+                    raise Exception("Failed to build the editor")
+                cook_platforms = "+".join(cook_platform_names.get(platform, platform) for platform in self.platforms)
+                command = rf'"{packager.get_editor_cmd()}" "{self.project.path}" -run=DerivedDataCache -fill -TargetPlatform={cook_platforms} -unattended'
+                if packager.run_command(command, packager.get_log_name("ddc")) != 0:
+                    raise Exception("Failed to fill the DerivedDataCache")
+                self.prepared = True
+            except Exception as error:
+                self.error = error
+                raise
+
+cook_platform_names = { "Win64": "Windows" }
@@ -0,0 +1,251 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from modules.console import console
+from modules.instrumentation import instrumentation
+
+
+class Stage:
+    """ Class containing information about a single stage of the pipeline """
+    name = ""
+    function = None
+    args = ()
+    depends = []
+    outputs = []
+    resource = None
+    group = None
+    status = "Pending"
+    duration = 0.0
+    error = None
+    measurement = None
+
+    def __init__(self, name, function, args, depends, outputs, resource, group=None):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.depends = depends
+        self.outputs = outputs
+        self.resource = resource
+        self.group = group
+
+    def run(self):
+        """ Execute the stage and record the duration """
+        start = time.perf_counter()
+        try:
+            with instrumentation.measure(self.name, "stage") as measurement:
+                self.measurement = measurement
+                self.function(*self.args)
+            self.status = "Succeeded"
+        except Exception as error:
+            self.status = "Failed"
+            self.error = error
+            raise
+        finally:
+            self.duration = time.perf_counter() - start
+
+
+class Pipeline:
+    """ Run the stages of a release as soon as the stages they depend on are completed """
+    limits = {}
+    fail_fast = True
+    history_path = ""
+    budget = None
+    stages = {}
+
+    def __init__(self, limits, fail_fast, history_path, budget=None):
+        self.limits = limits
+        self.fail_fast = fail_fast
+        self.history_path = history_path
+        self.budget = budget
+        self.stages = {}
+        self.history = {}
+        if os.path.exists(history_path):
+            with open(history_path, mode="r") as history_file:
+                self.history = json.load(history_file)
+
+    def add(self, name, function, *args, depends=None, outputs=None, resource=None, group=None):
+        """ Add a new stage to the pipeline """
+        if name in self.stages:
+            raise Exception(f"Stage {name} is already part of the pipeline")
+        for dependency in depends or []:
+            if dependency not in self.stages:
+                raise Exception(f"Stage {name} depends on unknown stage {dependency}")
+        self.stages[name] = Stage(name, function, args, depends or [], outputs or [], resource, group)
+        return name
+
+    def get_leaf_stages(self):
+        """ Get the stages that no other stage depends on """
+        dependencies = set(dependency for stage in self.stages.values() for dependency in stage.depends)
+        return [name for name in self.stages if name not in dependencies]
+
+    def run(self):
+        """ Run all the stages and print a summary once they are completed """
+        print(f"\nRunning pipeline with {len(self.stages)} stage(s)")
+        start = time.perf_counter()
+        running = {}
+        usage = { resource: 0 for resource in self.limits }
+        with ThreadPoolExecutor(max_workers=max(1, len(self.stages))) as executor:
+            while True:
+                for stage in self.get_ready_stages(usage):
+                    stage.status = "Running"
+                    running[executor.submit(stage.run)] = stage
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    if stage.resource is not None:
+                        usage[stage.resource] -= 1
+                    if self.is_budgeted(stage):
+                        self.budget.release(stage.name)
+                        if future.exception() is None and "uat" in stage.measurement.categories:
+                            self.budget.learn(stage.name, stage.measurement, stage.outputs)
+                    if future.exception() is not None:
+                        console.print(f"\n[{stage.name}] {future.exception()}")
+                        self.skip_dependents(stage)
+                        if self.fail_fast:
+                            self.cancel_pending(stage.group)
+        self.print_summary(time.perf_counter() - start)
+        self.save_history()
+        failed_stages = [stage.name for stage in self.stages.values() if stage.status == "Failed"]
+        if failed_stages:
+            raise Exception(f"The following stage(s) failed: {', '.join(failed_stages)}")
+
+    def get_ready_stages(self, usage):
+        """ Get the pending stages of which all dependencies succeeded and reserve their resources """
+        ready = []
+        for stage in self.stages.values():
+            if stage.status != "Pending":
+                continue
+            if any(self.stages[dependency].status != "Succeeded" for dependency in stage.depends):
+                continue
+            if stage.resource is not None and usage[stage.resource] >= self.limits[stage.resource]:
+                continue
+            if self.is_budgeted(stage) and not self.budget.admit(stage.name):
+                continue
+            if stage.resource is not None:
+                usage[stage.resource] += 1
+            ready.append(stage)
+        return ready
+
+    def is_budgeted(self, stage):
+        """ Check if a stage is only started once its estimated resource usage fits in the budget """
+        return self.budget is not None and stage.resource == self.budget.resource
+
+    def skip_dependents(self, failed_stage):
+        """ Skip all the stages that depend on a failed stage """
+        for stage in self.stages.values():
+            if stage.status == "Pending" and failed_stage.name in stage.depends:
+                stage.status = "Skipped"
+                self.skip_dependents(stage)
+
+    def cancel_pending(self, group=None):
+        """ Cancel all the stages of the group that have not started yet """
+        for stage in self.stages.values():
+            if stage.status == "Pending" and stage.group == group:
+                stage.status = "Cancelled"
+
+    def get_estimate(self, stage):
+        """ Get the expected duration of a stage based on previous runs """
+        return self.history.get(stage.name, 1.0)
+
+    def get_critical_path(self):
+        """ Get the chain of dependent stages with the longest expected duration """
+        finish = {}
+        previous = {}
+        for stage in self.stages.values():
+            start = 0.0
+            for dependency in stage.depends:
+                if finish[dependency] > start:
+                    start = finish[dependency]
+                    previous[stage.name] = dependency
+            finish[stage.name] = start + self.get_estimate(stage)
+        if not finish:
+            return [], 0.0
+        name = max(finish, key=finish.get)
+        duration = finish[name]
+        path = [name]
+        while name in previous:
+            name = previous[name]
+            path.insert(0, name)
+        return path, duration
+
+    def print_plan(self):
+        """ Print the stages, their dependencies and outputs and the critical path """
+        print("\nPlanned pipeline")
+        width = max((len(name) for name in self.stages), default=0)
+        for stage in self.stages.values():
+            estimate = format_duration(self.history[stage.name]) if stage.name in self.history else "unknown"
+            resource = f" [{stage.resource}]" if stage.resource else ""
+            print(f"{stage.name.ljust(width)} : estimate {estimate}{resource}")
+            if stage.depends:
+                print(f"{''.ljust(width)}   depends on {', '.join(stage.depends)}")
+            for output in stage.outputs:
+                print(f"{''.ljust(width)}   creates {output}")
+            if self.is_budgeted(stage):
+                print(f"{''.ljust(width)}   needs {self.budget.describe(stage.name)}")
+        path, duration = self.get_critical_path()
+        print(f"\nCritical path ({format_duration(duration) if self.history else 'no previous runs'})")
+        print(" -> ".join(path))
+
+    def print_summary(self, total_duration):
+        """ Print the status and duration of every stage """
+        width = max((len(name) for name in self.stages), default=5)
+        print("\nStage summary")
+        for stage in self.stages.values():
+            print(f"{stage.name.ljust(width)} : {stage.status.ljust(9)} {format_duration(stage.duration)}")
+        print(f"{'Total'.ljust(width)} : {''.ljust(9)} {format_duration(total_duration)}")
+        groups = list(dict.fromkeys(stage.group for stage in self.stages.values() if stage.group is not None))
+        if groups:
+            width = max(len(group) for group in groups)
+            print("\nPackage summary")
+            for group in groups:
+                stages = [stage for stage in self.stages.values() if stage.group == group]
+                succeeded = len([stage for stage in stages if stage.status == "Succeeded"])
+                status = "Succeeded" if succeeded == len(stages) else "Failed"
+                print(f"{group.ljust(width)} : {status.ljust(9)} {succeeded}/{len(stages)} stage(s) succeeded")
+
+    def save_history(self):
+        """ Save the duration of the stages that succeeded so it can be used to estimate future runs (reused results are skipped) """
+        for stage in self.stages.values():
+            if stage.status == "Succeeded" and not stage.measurement.reused:
+                self.history[stage.name] = stage.duration
+        os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+        with open(self.history_path, mode="w") as history_file:
+            json.dump(self.history, history_file, indent=4, sort_keys=True)
+        if self.budget is not None:
+            self.budget.save()
+
+
+class PipelineGroup:
+    """ Add the stages of a single package to a shared pipeline (the stage names are prefixed with the package name) """
+    pipeline = None
+    name = ""
+    stages = {}
+
+    def __init__(self, pipeline, name):
+        self.pipeline = pipeline
+        self.name = name
+        self.stages = {}
+
+    def add(self, name, function, *args, depends=None, outputs=None, resource=None):
+        """ Add a new stage of the package to the shared pipeline """
+        depends = [f"{self.name}/{dependency}" for dependency in depends or []]
+        self.pipeline.add(f"{self.name}/{name}", function, *args, depends=depends, outputs=outputs, resource=resource, group=self.name)
+        self.stages[name] = self.pipeline.stages[f"{self.name}/{name}"]
+        return name
+
+    def get_leaf_stages(self):
+        """ Get the stages of the package that no other stage depends on """
+        dependencies = set(dependency for stage in self.stages.values() for dependency in stage.depends)
+        return [name for name in self.stages if f"{self.name}/{name}" not in dependencies]
+
+def format_duration(seconds):
+    """ Format a duration in seconds as hours, minutes and seconds """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
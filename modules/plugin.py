@@ -4,22 +4,53 @@
 import os
 import json
 
+plugin_source_directories = ["Source", "Content", "Resources", "Config", "Shaders"]
+
 
 class Plugin:
     """ Class containing information about the plugin """
     name = ""
     path = ""
     version = ""
+    modules = []
+    platforms = []
     build_path_without_ue_version = ""
 
     def __init__(self, plugin, output):
-        with open(plugin) as plugin_file:
-            plugin_data = json.load(plugin_file)
+        try:
+            with open(plugin) as plugin_file:
+                plugin_data = json.load(plugin_file)
+        except ValueError as error:
+            raise Exception(f"Invalid plugin descriptor {plugin}: {error}")
+        for field in ["FriendlyName", "VersionName"]:
+            if not isinstance(plugin_data.get(field), str) or not plugin_data[field].strip():
+                raise Exception(f"Invalid plugin descriptor. {field} is not specified in {plugin}")
         self.name = plugin_data['FriendlyName'].replace(" ", "")
         self.version = plugin_data['VersionName']
         self.path = plugin
+        self.modules = [read_module(module) for module in plugin_data.get("Modules", [])]
+        self.platforms = plugin_data.get("SupportedTargetPlatforms", [])
+        if not self.platforms:
+            self.platforms = sorted(set(platform for module in self.modules for platform in module["platforms"]))
         self.build_path_without_ue_version = os.path.join(output, f"{self.name}-UE-v{self.version}")
 
     def getbuildpath(self, unreal_version):
         """ Get the output directory for the build using a specific version of Unreal Engine """
         return self.build_path_without_ue_version.replace("-UE-v", f"-UE{unreal_version}-v")
+
+    def getsourcepaths(self):
+        """ Get the files and directories used to build the plugin """
+        directory = os.path.dirname(self.path)
+        paths = [os.path.join(directory, name) for name in plugin_source_directories]
+        return [self.path] + [path for path in paths if os.path.exists(path)]
+
+
+def read_module(module):
+    """ Read the name, type and allowed platforms of a module in a plugin or project descriptor """
+    if not isinstance(module.get("Name"), str) or not module["Name"].strip():
+        raise Exception("Invalid descriptor. Module name is not specified")
+    return {
+        "name": module["Name"],
+        "type": module.get("Type", "Runtime"),
+        "platforms": module.get("PlatformAllowList", module.get("WhitelistPlatforms", []))
+    }
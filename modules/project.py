@@ -2,7 +2,11 @@
 # https://github.com/hfjooste/UnrealPackager
 
 import os
+import json
 import configparser
+from modules.plugin import read_module
+
+project_source_directories = ["Config", "Source", "Content", "Plugins"]
 
 
 class Project:
@@ -10,12 +14,21 @@ class Project:
     path = ""
     name = ""
     version = ""
+    modules = []
+    platforms = []
     build_path = ""
 
     def __init__(self, project, output):
+        try:
+            with open(project) as project_file:
+                project_data = json.load(project_file)
+        except ValueError as error:
+            raise Exception(f"Invalid project descriptor {project}: {error}")
         config = configparser.ConfigParser()
-        config.read(os.path.join(os.path.dirname(project), "Config", "DefaultGame.ini"))
+        config.read(getconfigpath(project))
         self.path = project
+        self.modules = [read_module(module) for module in project_data.get("Modules", [])]
+        self.platforms = project_data.get("TargetPlatforms", [])
         self.name = config.get("/Script/EngineSettings.GeneralProjectSettings", "ProjectName", fallback="UnrealProject").replace(" ", "")
         self.version = config.get("/Script/EngineSettings.GeneralProjectSettings", "ProjectVersion", fallback="1.0.0")
         self.build_path = os.path.join(output, f"{self.name}-v{self.version}-PLATFORM_ID")
@@ -23,3 +36,14 @@ class Project:
     def getbuildpath(self, platform):
         """ Get the output directory for the build using a specific platform """
         return self.build_path.replace("-PLATFORM_ID", f"-{platform}")
+
+    def getsourcepaths(self):
+        """ Get the files and directories used to build the project """
+        directory = os.path.dirname(self.path)
+        paths = [os.path.join(directory, name) for name in project_source_directories]
+        return [self.path] + [path for path in paths if os.path.exists(path)]
+
+
+def getconfigpath(project):
+    """ Get the path to the config file containing the name and version of the project """
+    return os.path.join(os.path.dirname(project), "Config", "DefaultGame.ini")
@@ -0,0 +1,131 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import json
+import shutil
+import threading
+from modules.console import console
+from modules.staging import format_size
+
+headroom = 1.1
+
+
+class ResourceBudget:
+    """ Admit builds while their estimated memory, CPU and disk usage fits in the budgets (builds that do not fit are queued) """
+    resource = "uat"
+    path = ""
+    costs_path = ""
+    memory = None
+    cpu = 0
+    min_free_disk = 0
+    defaults = {}
+    costs = {}
+    reserved = {}
+
+    def __init__(self, path, costs_path, memory, cpu, min_free_disk, defaults):
+        self.path = path
+        self.costs_path = costs_path
+        self.memory = memory if memory is not None else get_available_memory()
+        self.cpu = cpu or os.cpu_count() or 1
+        self.min_free_disk = min_free_disk
+        self.defaults = defaults
+        self.costs = {}
+        self.reserved = {}
+        self.waiting = set()
+        self.lock = threading.Lock()
+        if os.path.exists(costs_path):
+            with open(costs_path, mode="r") as costs_file:
+                self.costs = json.load(costs_file)
+
+    def get_cost(self, name):
+        """ Get the estimated memory, CPU and disk usage of a build (the defaults are used if it never ran before) """
+        return { **self.defaults, **self.costs.get(name, {}) }
+
+    def admit(self, name):
+        """ Reserve the resources of a build if they fit in the budgets. Returns False if the build has to wait """
+        cost = self.get_cost(name)
+        with self.lock:
+            shortage = self.get_shortage(cost)
+            if shortage is not None and self.reserved:
+                if name not in self.waiting:
+                    self.waiting.add(name)
+                    console.print(f"Queueing {name} until {shortage}")
+                return False
+            if shortage is not None:
+                console.print(f"Warning: Starting {name} on its own since it does not fit in the budget ({shortage})")
+            self.waiting.discard(name)
+            self.reserved[name] = cost
+        return True
+
+    def get_shortage(self, cost):
+        """ Get a description of the first budget the cost does not fit in (or None if it fits in every budget) """
+        if self.memory is not None:
+            available = self.memory - sum(reserved["memory"] for reserved in self.reserved.values())
+            if cost["memory"] > available:
+                return f"{format_size(cost['memory'])} of memory is available ({format_size(max(available, 0))} left)"
+        available = self.cpu - sum(reserved["cpu"] for reserved in self.reserved.values())
+        if cost["cpu"] > available:
+            return f"{cost['cpu']:.1f} CPU core(s) are available ({max(available, 0):.1f} left)"
+        available = get_free_disk(self.path) - self.min_free_disk - sum(reserved["disk"] for reserved in self.reserved.values())
+        if cost["disk"] > available:
+            return f"{format_size(cost['disk'])} of disk space is available ({format_size(max(available, 0))} left)"
+        return None
+
+    def release(self, name):
+        """ Release the resources reserved by a build that completed """
+        with self.lock:
+            self.reserved.pop(name, None)
+
+    def learn(self, name, measurement, outputs):
+        """ Update the cost of a build using the peak usage measured while it was running (plus some headroom) """
+        cost = self.get_cost(name)
+        if measurement.peak_rss:
+            cost["memory"] = int(measurement.peak_rss * headroom)
+        if measurement.process_cpu_time > 0 and measurement.wall_time > 0:
+            cost["cpu"] = round(measurement.process_cpu_time / measurement.wall_time * headroom, 2)
+        disk = max(measurement.bytes_written, sum(os.path.getsize(output) for output in outputs if os.path.isfile(output)))
+        if disk > 0:
+            cost["disk"] = int(disk * headroom)
+        with self.lock:
+            self.costs[name] = cost
+
+    def describe(self, name):
+        """ Get a description of the estimated usage of a build """
+        cost = self.get_cost(name)
+        source = "measured" if name in self.costs else "default"
+        return f"{format_size(cost['memory'])} memory, {cost['cpu']:.1f} CPU core(s), {format_size(cost['disk'])} disk ({source})"
+
+    def save(self):
+        """ Save the estimated usage of every build for the next run """
+        os.makedirs(os.path.dirname(self.costs_path), exist_ok=True)
+        with self.lock:
+            with open(self.costs_path, mode="w") as costs_file:
+                json.dump(self.costs, costs_file, indent=4, sort_keys=True)
+
+
+def get_available_memory():
+    """ Get the memory that is currently available (or None if it can not be determined) """
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    # MemAvailable includes the page cache that can be reclaimed, unlike the free pages reported by sysconf
+    try:
+        with open("/proc/meminfo", mode="r") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if hasattr(os, "sysconf") and "SC_AVPHYS_PAGES" in os.sysconf_names:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    return None
+
+def get_free_disk(path):
+    """ Get the free disk space of the drive containing the path (or the nearest parent that exists) """
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free
@@ -0,0 +1,196 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import re
+import gzip
+import shlex
+from modules.console import console
+from modules.instrumentation import instrumentation
+
+chunk_size = 64 * 1024
+max_line_length = 64 * 1024
+queue_size = 1024
+error_pattern = re.compile(r"(^|[\s:])(fatal )?error( [A-Z]+\d+)?\s*:", re.IGNORECASE)
+command_pattern = re.compile(r"\*{4,}\s*(\w+) COMMAND STARTED")
+action_pattern = re.compile(r"^\s*\[(\d+)/(\d+)\]")
+cook_pattern = re.compile(r"Cooked packages (\d+) Packages Remain (\d+) Total (\d+)")
+ddc_pattern = re.compile(r"TotalGet(Hits|Misses)\W+(\d+)")
+phases = [
+    ("Running AutomationTool", "Starting"),
+    ("Building plugin for target platforms", "Building"),
+    ("Parsing headers", "Generating headers"),
+    ("BUILD SUCCESSFUL", "Succeeded"),
+    ("BUILD FAILED", "Failed")
+]
+
+
+class Progress:
+    """ Class containing the progress and the first errors parsed from the RunUAT output """
+    phase = "Starting"
+    current = 0
+    total = 0
+    errors = []
+    error_count = 0
+    max_errors = 0
+    ddc_hits = 0
+    ddc_misses = 0
+
+    def __init__(self, max_errors):
+        self.errors = []
+        self.max_errors = max_errors
+
+    def parse(self, line):
+        """ Update the progress using a line of the output """
+        if error_pattern.search(line):
+            self.error_count += 1
+            if len(self.errors) < self.max_errors:
+                self.errors.append(line.strip())
+        for counter, value in ddc_pattern.findall(line):
+            if counter == "Hits":
+                self.ddc_hits = int(value)
+            else:
+                self.ddc_misses = int(value)
+        match = command_pattern.search(line)
+        if match:
+            self.set_phase(match.group(1).title())
+            return
+        match = cook_pattern.search(line)
+        if match:
+            self.phase = "Cook"
+            self.current = int(match.group(1))
+            self.total = int(match.group(3))
+            return
+        match = action_pattern.match(line)
+        if match:
+            if self.phase in ["Starting", "Building", "Generating headers"]:
+                self.phase = "Compile"
+            self.current = int(match.group(1))
+            self.total = int(match.group(2))
+            return
+        for marker, phase in phases:
+            if marker in line:
+                self.set_phase(phase)
+                return
+
+    def set_phase(self, phase):
+        """ Start a new phase and reset the progress """
+        self.phase = phase
+        self.current = 0
+        self.total = 0
+
+    def get_ddc_hit_rate(self):
+        """ Get the percentage of DerivedDataCache requests reported by the cook stats that were hits """
+        total = self.ddc_hits + self.ddc_misses
+        return self.ddc_hits * 100 / total if total > 0 else 0.0
+
+    def get_status(self):
+        """ Get the status shown on the console """
+        status = self.phase
+        if self.total > 0:
+            status += f" {self.current}/{self.total} ({int(self.current * 100 / self.total)}%)"
+        if self.error_count > 0:
+            status += f", {self.error_count} error(s)"
+        return status
+
+
+class CommandRunner:
+    """ Run commands asynchronously and stream the output to a compressed log file """
+    log_dir = None
+    max_errors = 10
+    echo = False
+
+    def __init__(self, log_dir=None, max_errors=10, echo=False):
+        self.log_dir = log_dir
+        self.max_errors = max_errors
+        self.echo = echo
+
+    def get_log_path(self, log_name):
+        """ Get the path to the compressed log file of a job (or None if logs are not saved) """
+        if self.log_dir is None:
+            return None
+        return os.path.join(self.log_dir, f"{log_name}.log.gz")
+
+    def open_log(self, log_name):
+        """ Open the compressed log file of a job """
+        log_path = self.get_log_path(log_name)
+        if log_path is None:
+            return open(os.devnull, mode="w")
+        os.makedirs(self.log_dir, exist_ok=True)
+        return gzip.open(log_path, mode="wt", compresslevel=6, encoding="utf-8", errors="replace")
+
+    def run(self, command, log_name, status_name, handler=None, measurement=None, environment=None):
+        """ Run the command and get the return code and the progress parsed from the output """
+        import asyncio
+        progress = Progress(self.max_errors)
+        try:
+            returncode = asyncio.run(self.run_async(command, log_name, status_name, progress, handler, measurement, environment))
+        finally:
+            console.remove_status(status_name)
+        return returncode, progress
+
+    async def run_async(self, command, log_name, status_name, progress, handler, measurement, environment):
+        """ Start the process and write the output of stdout and stderr to the log while it is running """
+        import asyncio
+        queue = asyncio.Queue(maxsize=queue_size)
+        command, environment = get_shell_command(command, environment)
+        process = await asyncio.create_subprocess_shell(command, stdout=asyncio.subprocess.PIPE,
+                                                        stderr=asyncio.subprocess.PIPE, env=environment)
+        with self.open_log(log_name) as log_file:
+            if measurement is not None:
+                with instrumentation.watch(measurement, process.pid):
+                    await self.stream_output(process, queue, log_file, status_name, progress, handler)
+            else:
+                await self.stream_output(process, queue, log_file, status_name, progress, handler)
+        return process.returncode
+
+    async def stream_output(self, process, queue, log_file, status_name, progress, handler):
+        """ Read stdout and stderr and write the lines to the log until the process exits """
+        import asyncio
+        readers = [asyncio.create_task(read_lines(process.stdout, queue, "")),
+                   asyncio.create_task(read_lines(process.stderr, queue, "stderr: "))]
+        writer = asyncio.create_task(self.write_lines(queue, len(readers), log_file, status_name, progress, handler))
+        await asyncio.gather(*readers)
+        await writer
+        await process.wait()
+
+    async def write_lines(self, queue, readers, log_file, status_name, progress, handler):
+        """ Write the lines in the queue to the log and update the status until every reader is done """
+        while readers > 0:
+            line = await queue.get()
+            if line is None:
+                readers -= 1
+                continue
+            log_file.write(line + "\n")
+            progress.parse(line)
+            console.set_status(status_name, progress.phase, progress.get_status())
+            if handler is not None:
+                handler(line)
+
+
+def get_shell_command(command, environment):
+    """ Add environment variables to a command (env is used on POSIX since dash drops names like UE-LocalDataCachePath) """
+    if not environment:
+        return command, None
+    if os.name == "nt":
+        return command, { **os.environ, **environment }
+    variables = " ".join(shlex.quote(f"{name}={value}") for name, value in environment.items())
+    return f"env {variables} {command}", None
+
+async def read_lines(stream, queue, prefix):
+    """ Split the stream into lines and add them to the queue (waits while the queue is full) """
+    pending = b""
+    while True:
+        data = await stream.read(chunk_size)
+        if not data:
+            break
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        if len(pending) > max_line_length:
+            lines.append(pending)
+            pending = b""
+        for line in lines:
+            await queue.put(prefix + line.rstrip(b"\r").decode("utf-8", errors="replace"))
+    if pending:
+        await queue.put(prefix + pending.rstrip(b"\r").decode("utf-8", errors="replace"))
+    await queue.put(None)
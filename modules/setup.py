@@ -2,19 +2,57 @@
 # https://github.com/hfjooste/UnrealPackager
 
 import os
-import subprocess
+import sys
+import json
+import importlib
+import importlib.util
 
 dependencies = [ 'argparse', 'configparser', 'requests' ]
+cache_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".unrealpackager-setup.json"))
 
 def run_setup():
     """ Ensure that all the dependencies are installed """
+    if is_setup_cached():
+        return
     for dependency in dependencies:
-        if subprocess.run(f'python -c "import {dependency}"', capture_output=True).returncode == 0:
+        if importlib.util.find_spec(dependency) is not None:
             continue
         print(f"Error: {dependency} is not installed")
         install = input(f"Do you want to install {dependency} (yes/no): ")
         print(install)
         if install.lower().strip() != "yes" and install.lower().strip() != "y":
             raise Exception("Failed to run Unreal Packager. Please install the missing dependencies and try again")
-        if os.system(f"pip install {dependency}") != 0:
+        if os.system(f"\"{sys.executable}\" -m pip install {dependency}") != 0:
             raise Exception(f"Failed to install {dependency}")
+        importlib.invalidate_caches()
+    save_setup_cache()
+
+def get_setup_key():
+    """ Get the key identifying the Python installation and the dependencies that were checked """
+    return { "executable": sys.executable, "version": sys.version, "dependencies": dependencies }
+
+def is_setup_cached():
+    """ Check if the dependencies were already found using the same Python installation """
+    if not os.path.exists(cache_path):
+        return False
+    try:
+        with open(cache_path, mode="r") as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return False
+    if cache.get("key") != get_setup_key():
+        return False
+    return all(os.path.exists(origin) for origin in cache.get("origins", []))
+
+def save_setup_cache():
+    """ Save the location of the dependencies so the next run can skip the checks """
+    origins = []
+    for dependency in dependencies:
+        spec = importlib.util.find_spec(dependency)
+        if spec is not None and spec.origin and os.path.isabs(spec.origin):
+            origins.append(spec.origin)
+    try:
+        with open(cache_path, mode="w") as cache_file:
+            json.dump({ "key": get_setup_key(), "origins": origins }, cache_file, indent=4)
+    except OSError:
+        pass
@@ -0,0 +1,107 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import shutil
+import threading
+from modules.instrumentation import instrumentation
+
+ficlone = 0x40049409
+methods = ["linked", "cloned", "moved", "copied"]
+
+
+class Stager:
+    """ Place artifacts using hard links, reflinks or renames and only copy the data when nothing else works """
+    totals = {}
+
+    def __init__(self):
+        self.totals = { method: 0 for method in methods }
+        self.lock = threading.Lock()
+
+    def link(self, source, destination, hardlink=True):
+        """ Place a file while keeping the source (hard links should only be used if neither file is changed in place) """
+        with instrumentation.measure(f"Stage {os.path.basename(destination)}", "staging") as measurement:
+            temp_destination = self.get_temp_path(destination)
+            if hardlink and try_hardlink(source, temp_destination):
+                method = "linked"
+            elif try_reflink(source, temp_destination):
+                method = "cloned"
+            else:
+                shutil.copy2(source, temp_destination)
+                method = "copied"
+            os.replace(temp_destination, destination)
+            self.add(method, destination, measurement)
+        return method
+
+    def move(self, source, destination):
+        """ Move a file (the data is only copied if the destination is on another file system) """
+        with instrumentation.measure(f"Stage {os.path.basename(destination)}", "staging") as measurement:
+            try:
+                os.replace(source, destination)
+                method = "moved"
+            except OSError:
+                temp_destination = self.get_temp_path(destination)
+                shutil.copyfile(source, temp_destination)
+                os.replace(temp_destination, destination)
+                os.remove(source)
+                method = "copied"
+            self.add(method, destination, measurement)
+        return method
+
+    def get_temp_path(self, destination):
+        """ Get the temporary path used to place a file before it replaces the destination """
+        temp_destination = f"{destination}.{threading.get_ident()}.tmp"
+        if os.path.exists(temp_destination):
+            os.remove(temp_destination)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        return temp_destination
+
+    def add(self, method, destination, measurement):
+        """ Add the size of a placed file to the totals of the method used """
+        size = os.path.getsize(destination)
+        if method == "copied":
+            measurement.bytes_read = size
+            measurement.bytes_written = size
+        with self.lock:
+            self.totals[method] += size
+
+    def print_summary(self):
+        """ Print the number of bytes placed using every method """
+        with self.lock:
+            totals = dict(self.totals)
+        if any(totals.values()):
+            print(f"Staged artifacts: {', '.join(f'{format_size(totals[method])} {method}' for method in methods)}")
+
+
+def try_hardlink(source, destination):
+    """ Create a hard link to the source. Returns False if hard links are not supported """
+    try:
+        os.link(source, destination)
+        return True
+    except (OSError, AttributeError, NotImplementedError):
+        return False
+
+def try_reflink(source, destination):
+    """ Clone the source using a copy-on-write reflink (Btrfs, XFS). Returns False if reflinks are not supported """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(source, mode="rb") as source_file, open(destination, mode="wb") as destination_file:
+            fcntl.ioctl(destination_file.fileno(), ficlone, source_file.fileno())
+        shutil.copystat(source, destination)
+        return True
+    except OSError:
+        if os.path.exists(destination):
+            os.remove(destination)
+        return False
+
+def format_size(size):
+    """ Format a number of bytes using the largest unit that fits """
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} {unit}"
+        size /= 1024
+
+stager = Stager()
@@ -2,13 +2,26 @@
 # https://github.com/hfjooste/UnrealPackager
 
 import os
-import json
-import shutil
-import requests
 import subprocess
-from modules.packager import Packager
-from modules.plugin import Plugin
-from modules.project import Project
+from modules.packager import Packager, SharedProjectBuild
+from modules.runner import CommandRunner
+from modules.dedup import ContentStore, restore_artifact
+from modules.checksum import write_checksums, load_checksums, verify_directory, checksum_file_name, manifest_file_name
+from modules.metadata import load_plugin, load_project
+from modules.plugin import plugin_source_directories
+from modules.project import project_source_directories
+from modules.pipeline import Pipeline, PipelineGroup
+from modules.resources import ResourceBudget
+from modules.cache import BuildCache
+from modules.archive import Archiver
+from modules.github import GitHub
+from modules.manifest import Manifest
+from modules.config import Config, get_batch_packages
+from modules.cache import get_build_key, clear_source_hashes
+from modules.console import console
+from modules.instrumentation import instrumentation
+from modules.staging import stager
+from modules.watcher import Watcher
 
 
 def run_pre_task(config):
@@ -24,89 +37,410 @@ def run_post_task(config):
         os.system(f"python \"{config.task_post}\"")
 
 
-def package_plugin(config):
-    """ Package the plugin """
+def get_plugin(config):
+    """ Get the plugin specified in the config file (or None if no plugin is specified) """
     if config.plugin_path and not config.plugin_path.isspace():
-        plugin = Plugin(config.plugin_path, config.output)
-        for unreal_version in config.plugin_unreal_versions:
-            packager = Packager(config.unreal_install_dir, unreal_version)
-            packager.package_plugin(plugin, config.plugin_visual_studio)
+        return load_plugin(config.plugin_path, config.output)
+    return None
 
-def package_project(config):
-    """ Package the project """
+def get_project(config):
+    """ Get the project specified in the config file (or None if no project is specified) """
     if config.project_path and not config.project_path.isspace():
-        project = Project(config.project_path, config.output)
+        return load_project(config.project_path, config.output)
+    return None
+
+def package_plugin(config, pipeline, cache, archiver, manifest, runner, coordinator, depends=("pre-task",)):
+    """ Add a stage to the pipeline for packaging the plugin using every Unreal Engine version """
+    stages = []
+    plugin = get_plugin(config)
+    if plugin is not None:
+        for unreal_version in config.plugin_unreal_versions:
+            if coordinator is not None:
+                from modules.distributed import RemotePackager
+                packager = RemotePackager(coordinator, config.unreal_install_dir, unreal_version,
+                                          get_log_prefix(config, f"UE{unreal_version}"), cache, archiver, manifest, runner)
+            else:
+                packager = Packager(config.unreal_install_dir, unreal_version, get_log_prefix(config, f"UE{unreal_version}"),
+                                    cache, archiver, manifest, runner)
+            outputs = [plugin.getbuildpath(unreal_version) + archiver.get_extension()]
+            stages.append(pipeline.add(f"plugin:{unreal_version}", packager.package_plugin, plugin, config.plugin_visual_studio,
+                                       depends=list(depends), outputs=outputs, resource=None if coordinator else "uat"))
+    return stages
+
+def package_project(config, pipeline, cache, archiver, manifest, runner, depends=("pre-task",)):
+    """ Add a stage to the pipeline for packaging the project for every platform """
+    stages = []
+    project = get_project(config)
+    if project is not None:
+        shared_build = None
+        if config.project_shared_build:
+            shared_build = SharedProjectBuild(project, config.project_platforms, config.project_ddc_path)
         for platform in config.project_platforms:
-            packager = Packager(config.unreal_install_dir, config.project_unreal_version)
-            packager.package_project(project, platform)
+            if project.platforms and platform not in project.platforms:
+                print(f"Warning: {platform} is not one of the target platforms of {project.name} ({', '.join(project.platforms)})")
+            packager = Packager(config.unreal_install_dir, config.project_unreal_version, get_log_prefix(config, platform),
+                                cache, archiver, manifest, runner, shared_build)
+            outputs = [project.getbuildpath(platform) + archiver.get_extension()]
+            stages.append(pipeline.add(f"project:{platform}", packager.package_project, project, platform,
+                                       depends=list(depends), outputs=outputs, resource="uat"))
+    return stages
+
+def get_log_prefix(config, name):
+    """ Get the prefix used in the log of a build (the package name is included in batches) """
+    return f"{config.name}/{name}" if config.name else name
+
+def get_coordinator(config):
+    """ Get the coordinator handing out the plugin builds to the workers (or None if distributed builds are disabled) """
+    if config.distributed_enabled:
+        from modules.distributed import Coordinator
+        return Coordinator(config.distributed_host, config.distributed_port, config.distributed_token,
+                           config.distributed_job_timeout, os.path.join(config.cache_dir, "distributed"))
+    return None
+
+def run_worker(config):
+    """ Build the jobs of the coordinator until the worker is stopped """
+    from modules.distributed import Worker
+    worker = Worker(config.worker, config.worker_name, config.unreal_install_dir, config.distributed_token,
+                    os.path.join(config.cache_dir, "worker"), config.archive_threads,
+                    CommandRunner(None, config.logs_max_errors, config.logs_echo))
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        print("Worker stopped")
+
+def get_build_paths(config):
+    """ Get the output directories of every plugin and project build """
+    paths = []
+    plugin = get_plugin(config)
+    if plugin is not None:
+        paths += [plugin.getbuildpath(unreal_version) for unreal_version in config.plugin_unreal_versions]
+    project = get_project(config)
+    if project is not None:
+        paths += [project.getbuildpath(platform) for platform in config.project_platforms]
+    return paths
+
+def get_content_pack_path(config):
+    """ Get the path to the content pack containing the chunks of the builds of this release """
+    descriptor = get_plugin(config) or get_project(config)
+    return os.path.join(config.output, f"{descriptor.name}-v{descriptor.version}-content.pack")
+
+def create_content_store(config, manifest):
+    """ Split the builds into content-defined chunks and save the content pack and a manifest for every build """
+    artifacts = get_build_paths(config)
+    key = get_build_key(artifacts, config.dedup_chunk_size, config.dedup_reuse_previous, config.archive_compression_level,
+                        config.archive_store_extensions)
+    if manifest.is_up_to_date("dedup", key):
+        console.print("Content pack is up to date")
+        return
+    console.print("Creating content pack")
+    descriptor = get_plugin(config) or get_project(config)
+    store = ContentStore(os.path.join(config.cache_dir, "dedup", descriptor.name), config.dedup_chunk_size,
+                         config.archive_compression_level, config.archive_store_extensions, config.dedup_reuse_previous,
+                         config.archive_threads)
+    manifest.record("dedup", key, store.create(artifacts, get_content_pack_path(config)))
+
+def get_archiver(config):
+    """ Get the archiver used to create the archives using the configured settings """
+    return Archiver(config.archive_format, config.archive_compression_level,
+                    config.archive_store_extensions, config.archive_threads)
+
+def get_runner(config):
+    """ Get the runner used to run the builds and save their logs to the output directory """
+    return CommandRunner(os.path.join(config.output, "logs"), config.logs_max_errors, config.logs_echo)
+
+def get_budget(config):
+    """ Get the memory, CPU and disk budget of the builds (or None if resource-aware scheduling is disabled) """
+    if not config.resources_enabled:
+        return None
+    defaults = { "memory": config.resources_default_memory, "cpu": config.resources_default_cpu,
+                 "disk": config.resources_default_disk }
+    return ResourceBudget(config.output, os.path.join(config.cache_dir, "costs.json"), config.resources_memory,
+                          config.resources_cpu, config.resources_min_free_disk, defaults)
+
+def write_report(*configs):
+    """ Print how the artifacts were staged and write the timing and resource usage report to the output directory of every package """
+    stager.print_summary()
+    for config in configs:
+        if config.report_formats or config.report_trace:
+            instrumentation.write_report(os.path.join(config.output, "reports"), config.report_formats, config.report_trace,
+                                         config.name or None)
+
+def create_pipeline(args, config, manifest):
+    """ Create the pipeline containing every stage of the release and the dependencies between them """
+    pipeline = Pipeline(get_limits([config]), config.fail_fast, os.path.join(config.cache_dir, "history.json"),
+                        get_budget(config))
+    cache = BuildCache(config.cache_dir, config.cache_size, not args.no_cache)
+    add_package(args, config, manifest, pipeline, cache, get_coordinator(config))
+    return pipeline
+
+def load_batch(args):
+    """ Load the config of every package in the batch (packages with an invalid config are returned as failures) """
+    packages = []
+    failures = {}
+    outputs = {}
+    for name, path, package in get_batch_packages(args.batch):
+        print(f"Loading package {name}")
+        try:
+            config = Config(args, path, package, name)
+            if config.output in outputs:
+                raise Exception(f"Output directory is already used by package {outputs[config.output]}")
+            outputs[config.output] = name
+            packages.append((name, config, Manifest(config.output, config.incremental)))
+        except Exception as error:
+            print(f"Error: {error}")
+            failures[name] = error
+    if not packages and not failures:
+        raise Exception(f"No packages found in batch {args.batch}")
+    return packages, failures
+
+def create_batch_pipeline(args, packages):
+    """ Create a single pipeline containing the stages of every package (the settings of the first package are shared) """
+    shared = packages[0][1]
+    pipeline = Pipeline(get_limits([config for _, config, _ in packages]), shared.fail_fast,
+                        os.path.join(shared.cache_dir, "history.json"), get_budget(shared))
+    cache = BuildCache(shared.cache_dir, shared.cache_size, not args.no_cache)
+    coordinator = get_coordinator(shared)
+    for name, config, manifest in packages:
+        add_package(args, config, manifest, PipelineGroup(pipeline, name), cache, coordinator)
+    return pipeline
+
+def run_batch(args, packages, failures):
+    """ Run the stages of every package in the batch and raise an error listing the packages that failed """
+    if packages and args.dry_run:
+        create_batch_pipeline(args, packages).print_plan()
+    elif packages:
+        pipeline = create_batch_pipeline(args, packages)
+        error = None
+        try:
+            pipeline.run()
+        except Exception as exception:
+            error = exception
+        finally:
+            write_report(*[config for _, config, _ in packages])
+        for name, _, _ in packages:
+            if any(stage.status != "Succeeded" for stage in pipeline.stages.values() if stage.group == name):
+                failures[name] = "One or more stages failed"
+        if error is not None and not failures:
+            raise error
+    for name, error in failures.items():
+        print(f"{name} : {error}")
+    if failures:
+        raise Exception(f"The following package(s) failed: {', '.join(failures)}")
+
+def get_watch_paths(config):
+    """ Get the directories watched for changes and whether their subdirectories are watched as well """
+    paths = [(os.path.dirname(config.path), False)]
+    if config.plugin_path and not config.plugin_path.isspace():
+        paths.append((os.path.dirname(config.plugin_path), True))
+    if config.project_path and not config.project_path.isspace():
+        paths.append((os.path.dirname(config.project_path), True))
+    if config.mkdocs_include_pdf or config.mkdocs_create_zip:
+        paths.append((os.path.join(config.mkdocs_path, "site"), True))
+    return paths
+
+def get_affected_stages(config, paths):
+    """ Get the stages affected by the changed paths (or None if the config file changed and every stage is affected) """
+    stages = set()
+    modules = set()
+    for path in paths:
+        if path == config.path:
+            return None
+        plugin = get_relative_parts(path, config.plugin_path)
+        if plugin and (plugin[0] in plugin_source_directories or plugin[0].endswith(".uplugin")):
+            stages.add("plugin")
+            if plugin[0] == "Source" and len(plugin) > 2:
+                modules.add(plugin[1])
+        project = get_relative_parts(path, config.project_path)
+        if project and (project[0] in project_source_directories or project[0].endswith(".uproject")):
+            stages.add("project")
+        docs = get_relative_parts(path, os.path.join(config.mkdocs_path, "mkdocs.yml"))
+        if docs and docs[0] == "site":
+            stages.add("docs:pdf" if docs[1:2] == ["pdf"] else "docs:zip")
+    if modules:
+        console.print(f"Changed plugin module(s): {', '.join(sorted(modules))}")
+    return stages
+
+def get_relative_parts(path, descriptor_path):
+    """ Get the parts of a path relative to the directory of a descriptor (or None if the path is not inside that directory) """
+    if not descriptor_path or descriptor_path.isspace():
+        return None
+    directory = os.path.dirname(descriptor_path)
+    if not path.startswith(os.path.join(directory, "")):
+        return None
+    return os.path.relpath(path, directory).split(os.sep)
+
+def create_watch_pipeline(config, manifest, cache, coordinator, stages):
+    """ Create a pipeline containing only the stages affected by the changes (every build and documentation stage if stages is None) """
+    pipeline = Pipeline(get_limits([config]), config.fail_fast, os.path.join(config.cache_dir, "history.json"),
+                        get_budget(config))
+    archiver = get_archiver(config)
+    runner = get_runner(config)
+    if stages is None or "plugin" in stages:
+        package_plugin(config, pipeline, cache, archiver, manifest, runner, coordinator, depends=[])
+    if stages is None or "project" in stages:
+        package_project(config, pipeline, cache, archiver, manifest, runner, depends=[])
+    if config.mkdocs_include_pdf and (stages is None or "docs:pdf" in stages):
+        pipeline.add("docs:pdf", save_docs_pdf, config, manifest, outputs=[get_documentation_pdf_path(config)])
+    if config.mkdocs_create_zip and (stages is None or "docs:zip" in stages):
+        pipeline.add("docs:zip", create_docs_zip, config, manifest, outputs=[get_documentation_website_path(config)])
+    return pipeline
+
+def run_watch(args, config):
+    """ Package everything once and then only repackage the stages affected by the changes until the watch is stopped """
+    coordinator = get_coordinator(config)
+    stages = None
+    try:
+        while True:
+            cache = BuildCache(config.cache_dir, config.cache_size, not args.no_cache)
+            manifest = Manifest(config.output, True)
+            with Watcher(get_watch_paths(config), [config.output, config.cache_dir],
+                         config.watch_debounce, config.watch_poll_interval) as watcher:
+                while True:
+                    clear_source_hashes()
+                    if coordinator is not None:
+                        coordinator.clear_sources()
+                    pipeline = create_watch_pipeline(config, manifest, cache, coordinator, stages)
+                    if pipeline.stages:
+                        try:
+                            pipeline.run()
+                        except Exception as error:
+                            print(f"Error: {error}")
+                        finally:
+                            write_report(config)
+                    print("\nWatching for changes (press Ctrl+C to stop)")
+                    stages = get_affected_stages(config, watcher.wait())
+                    while stages is not None and not stages:
+                        stages = get_affected_stages(config, watcher.wait())
+                    if stages is None:
+                        break
+            print("Config file changed. Reloading config")
+            try:
+                config = Config(args, config.path, None, config.name)
+            except Exception as error:
+                print(f"Error: {error}")
+            if coordinator is not None:
+                coordinator.stop()
+            coordinator = get_coordinator(config)
+    except KeyboardInterrupt:
+        print("Watch stopped")
+    finally:
+        if coordinator is not None:
+            coordinator.stop()
+
+def get_limits(configs):
+    """ Get the maximum number of builds and uploads that can run at the same time """
+    limits = { "uat": configs[0].max_parallel_builds }
+    upload_threads = [config.github_upload_threads for config in configs if config.github_create_release]
+    if upload_threads:
+        limits["upload"] = max(upload_threads)
+    return limits
+
+def add_package(args, config, manifest, pipeline, cache, coordinator):
+    """ Add every stage of the release of a package and the dependencies between them to the pipeline """
+    archiver = get_archiver(config)
+    pipeline.add("pre-task", run_pre_task, config)
+    runner = get_runner(config)
+    artifact_stages = package_plugin(config, pipeline, cache, archiver, manifest, runner, coordinator)
+    artifact_stages += package_project(config, pipeline, cache, archiver, manifest, runner)
+    excluded = []
+    if config.dedup_enabled and artifact_stages:
+        if not config.dedup_upload_archives:
+            excluded = [output for stage in artifact_stages for output in pipeline.stages[stage].outputs]
+        artifact_stages.append(pipeline.add("dedup", create_content_store, config, manifest, depends=list(artifact_stages),
+                                            outputs=[get_content_pack_path(config)]))
+    docs_depends = ["pre-task"]
+    if config.mkdocs_auto_deploy:
+        docs_depends.append(pipeline.add("docs:deploy", deploy_docs, config, depends=["pre-task"]))
+    if config.mkdocs_include_pdf:
+        artifact_stages.append(pipeline.add("docs:pdf", save_docs_pdf, config, manifest, depends=docs_depends,
+                                            outputs=[get_documentation_pdf_path(config)]))
+    if config.mkdocs_create_zip:
+        artifact_stages.append(pipeline.add("docs:zip", create_docs_zip, config, manifest, depends=docs_depends,
+                                            outputs=[get_documentation_website_path(config)]))
+    pipeline.add("prune", manifest.prune, depends=artifact_stages)
+    release_depends = ["prune"]
+    if config.checksums_enabled:
+        release_depends.append(pipeline.add("checksums", create_checksums, config, excluded, depends=["prune"],
+                                            outputs=[os.path.join(config.output, checksum_file_name),
+                                                     os.path.join(config.output, manifest_file_name)]))
+    if config.github_create_release:
+        github = GitHub(config.github_api_url, config.github_owner, config.github_repo, config.github_token,
+                        config.github_upload_threads, config.github_upload_retries)
+        pipeline.add("release:create", create_release, args, config, github, depends=["pre-task"])
+        upload_stages = []
+        for stage in artifact_stages:
+            for output in pipeline.stages[stage].outputs if stage != "dedup" else []:
+                if output in excluded:
+                    continue
+                upload_stages.append(pipeline.add(f"upload:{os.path.basename(output)}", github.upload_asset, output,
+                                                  depends=["release:create", stage], resource="upload"))
+        pipeline.add("release:finish", finish_release, config, github, excluded, depends=release_depends + upload_stages)
+    pipeline.add("post-task", run_post_task, config, depends=pipeline.get_leaf_stages())
 
 def deploy_docs(config):
     """ Deploy the documentation """
     if config.mkdocs_auto_deploy:
-        print("Deploying documentation")
+        console.print("Deploying documentation")
         subprocess.run(rf'mkdocs gh-deploy --force --config-file "{os.path.join(config.mkdocs_path, "mkdocs.yml")}"')
 
 def get_documentation_pdf_path(config):
     """ Get the path to the documentation PDF """
-    if config.plugin_path and not config.plugin_path.isspace():
-        plugin = Plugin(config.plugin_path, config.output)
+    plugin = get_plugin(config)
+    if plugin is not None:
         return os.path.join(config.output, f"{plugin.name}Documentation-v{plugin.version}.pdf")
-    if config.project_path and not config.project_path.isspace():
-        project = Project(config.project_path, config.output)
+    project = get_project(config)
+    if project is not None:
         return os.path.join(config.output, f"{project.name}Documentation-v{project.version}.pdf")
     return os.path.join(config.output, f"Documentation.pdf")
 
 def get_documentation_website_path(config):
     """ Get the path to the documentation website archive """
-    if config.plugin_path and not config.plugin_path.isspace():
-        plugin = Plugin(config.plugin_path, config.output)
+    plugin = get_plugin(config)
+    if plugin is not None:
         return os.path.join(config.output, f"{plugin.name}Documentation-v{plugin.version}.zip")
-    if config.project_path and not config.project_path.isspace():
-        project = Project(config.project_path, config.output)
+    project = get_project(config)
+    if project is not None:
         return os.path.join(config.output, f"{project.name}Documentation-v{project.version}.zip")
     return os.path.join(config.output, f"Documentation.zip")
 
-def save_docs_pdf(config):
+def save_docs_pdf(config, manifest):
     """ Save the documentation PDF """
     if not config.mkdocs_include_pdf:
         return
-    print("Copying documentation PDF to output directory")
-    pdf = os.path.join(config.mkdocs_path, "site\\pdf\\document.pdf")
+    pdf = os.path.join(config.mkdocs_path, "site", "pdf", "document.pdf")
     if not os.path.exists(pdf):
         raise Exception("PDF file could not be found")
     documentation_pdf_path = get_documentation_pdf_path(config)
-    if os.path.exists(documentation_pdf_path):
-        os.remove(documentation_pdf_path)
-    shutil.copy2(pdf, documentation_pdf_path)
+    key = get_build_key([pdf], documentation_pdf_path)
+    if manifest.is_up_to_date("docs:pdf", key):
+        console.print("Documentation PDF is up to date")
+        return
+    console.print(f"Placing documentation PDF in output directory ({stager.link(pdf, documentation_pdf_path, hardlink=False)})")
+    manifest.record("docs:pdf", key, [documentation_pdf_path])
 
-def create_docs_zip(config):
+def create_docs_zip(config, manifest):
     """ Create a ZIP of the documentation website """
     if not config.mkdocs_create_zip:
         return
-    print("Creating ZIP for documentation website")
     site = os.path.join(config.mkdocs_path, "site")
     if not os.path.exists(site):
         raise Exception("Documentation could not be found")
     documentation_website_path = get_documentation_website_path(config)
-    if os.path.exists(documentation_website_path):
-        os.remove(documentation_website_path)
-    shutil.make_archive(site, "zip", site)
-    shutil.move(f"{site}.zip", documentation_website_path)
-
-def create_release(args, config):
-    """ Create a release on GitHub """
-    if not config.github_create_release:
+    key = get_build_key([site], documentation_website_path, config.archive_compression_level)
+    if manifest.is_up_to_date("docs:zip", key):
+        console.print("Documentation ZIP is up to date")
         return
-    print("\nCreating new release on GitHub")
+    console.print("Creating ZIP for documentation website")
+    get_archiver(config).create(site, documentation_website_path, "zip")
+    manifest.record("docs:zip", key, [documentation_website_path])
+
+def create_release(args, config, github):
+    """ Create a draft release on GitHub (it is published once every asset was uploaded) """
+    console.print("\nCreating new draft release on GitHub")
     with open(config.github_release_notes, mode="r") as release_notes_file:
         release_notes = release_notes_file.read()
-    url = f"https://api.github.com/repos/{config.github_owner}/{config.github_repo}/releases"
-    plugin = None
-    if config.plugin_path and not config.plugin_path.isspace():
-        plugin = Plugin(config.plugin_path, config.output)
-    project = None
-    if config.project_path and not config.project_path.isspace():
-        project = Project(config.project_path, config.output)
+    plugin = get_plugin(config)
+    project = get_project(config)
     release = ""
     if plugin != None:
         release = plugin.version
@@ -123,38 +457,49 @@ def create_release(args, config):
         commit = args.github_commit.strip()
     data = {
         "tag_name" : tag,
-        "target_commitish": config.github_commit,
+        "target_commitish": commit,
         "name" : f"Version {version}",
         "body" : release_notes,
         "prerelease" : args.github_prerelease
     }
-    headers = {
-        'Accept' : 'application/vnd.github+json',
-        'Authorization' : f'Bearer {config.github_token}',
-        'X-GitHub-Api-Version': '2022-11-28'
-    }
-    response = requests.post(url, data=json.dumps(data), headers=headers)
-    if not response.ok:
-        print(response.content)
-        raise Exception("Failed to create new release on Github")
-    release = json.loads(response.content)
-    release_id = release['id']
-    for file_name in os.listdir(config.output):
+    github.create_release(data)
+
+def get_release_files(config, excluded):
+    """ Get the files in the output directory that are released (except the excluded files) """
+    files = []
+    for file_name in sorted(os.listdir(config.output)):
         file_path = os.path.join(config.output, file_name)
-        if os.path.isfile(file_path):
-            print(f"Uploading {file_name}")
-            with open(file_path, mode="rb") as release_file:
-                content = release_file.read()
-            url = f'https://uploads.github.com/repos/{config.github_owner}/{config.github_repo}/releases/{release_id}/assets?name={file_name}'
-            headers = {
-                'Accept' : 'application/vnd.github+json',
-                'Authorization' : f'Bearer {config.github_token}',
-                'X-GitHub-Api-Version': '2022-11-28',
-                'Content-Type': 'application/octet-stream'
-            }
-            response = requests.post(url, data=content, headers=headers)
-            if not response.ok:
-                print(response.content)
-                raise Exception(f"Failed to upload {file_name}")
-    release_url = release['html_url']
-    print(f"Release created: {release_url}")
\ No newline at end of file
+        if file_path in excluded or file_name.endswith(".tmp"):
+            continue
+        if os.path.isfile(file_path) and not file_name.startswith("."):
+            files.append(file_path)
+    return files
+
+def create_checksums(config, excluded):
+    """ Write the checksums of the files that are released """
+    checksum_files = [checksum_file_name, manifest_file_name]
+    files = [file for file in get_release_files(config, excluded) if os.path.basename(file) not in checksum_files]
+    write_checksums(config.output, files, config.checksums_threads)
+
+def verify_release(config, github, files):
+    """ Verify that GitHub received the same bytes for every file with a checksum """
+    names = [os.path.basename(file) for file in files]
+    checksums = { name: value for name, value in load_checksums(config.output).items() if name in names }
+    errors, unverified = github.verify_assets(checksums)
+    for error in errors:
+        console.print(f"Error: {error}")
+    if errors:
+        raise Exception(f"{len(errors)} of {len(checksums)} asset(s) failed verification")
+    message = f"Verified {len(checksums)} uploaded asset(s)"
+    if unverified > 0:
+        message += f" ({unverified} only by size since GitHub did not report a digest)"
+    console.print(message)
+
+def finish_release(config, github, excluded):
+    """ Upload the remaining files in the output directory (except the excluded files) and publish the release on GitHub """
+    files = get_release_files(config, excluded)
+    github.upload_assets([file for file in files if not github.is_uploaded(file)])
+    if config.checksums_enabled:
+        verify_release(config, github, files)
+    release_url = github.publish_release()['html_url']
+    console.print(f"Release created: {release_url}")
@@ -0,0 +1,137 @@
+# Created by Henry Jooste
+# https://github.com/hfjooste/UnrealPackager
+
+import os
+import time
+import threading
+
+ignored_directories = ["Binaries", "Intermediate", "Saved", "DerivedDataCache", ".git", ".vs", ".idea", "__pycache__"]
+ignored_extensions = [".tmp", ".swp", ".swx", "~"]
+
+
+class Watcher:
+    """ Watch directories for changes using watchdog (or polling if watchdog is not installed) and report them in debounced batches """
+    paths = []
+    excluded = []
+    debounce = 0.0
+    poll_interval = 0.0
+    changes = set()
+    last_change = 0.0
+
+    def __init__(self, paths, excluded, debounce, poll_interval):
+        self.paths = [(os.path.abspath(path), recursive) for path, recursive in paths if os.path.isdir(path)]
+        self.excluded = [os.path.join(os.path.abspath(path), "") for path in excluded]
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.changes = set()
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.stopped = threading.Event()
+        self.observer = None
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.stop()
+
+    def start(self):
+        """ Start watching the directories """
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("watchdog is not installed. Polling for changes instead")
+            self.thread = threading.Thread(target=self.poll, daemon=True)
+            self.thread.start()
+            return
+        watcher = self
+
+        class EventHandler(FileSystemEventHandler):
+            """ Add the paths of the file system events to the changes """
+            def on_any_event(self, event):
+                if event.event_type not in ["created", "modified", "deleted", "moved"]:
+                    return
+                watcher.add([event.src_path, getattr(event, "dest_path", "")])
+
+        self.observer = Observer()
+        for path, recursive in self.paths:
+            self.observer.schedule(EventHandler(), path, recursive=recursive)
+        self.observer.start()
+
+    def stop(self):
+        """ Stop watching the directories """
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        if self.thread is not None:
+            self.thread.join()
+
+    def add(self, paths):
+        """ Add changed paths (ignored paths are skipped) and restart the debounce period """
+        paths = [path for path in paths if path and not self.is_ignored(path)]
+        if not paths:
+            return
+        with self.lock:
+            self.changes.update(os.path.abspath(path) for path in paths)
+            self.last_change = time.monotonic()
+        self.changed.set()
+
+    def is_ignored(self, path):
+        """ Check if a path is build output, temporary or inside an excluded directory """
+        path = os.path.abspath(path)
+        if path.endswith(tuple(ignored_extensions)) or any(path.startswith(excluded) for excluded in self.excluded):
+            return True
+        for root, _ in self.paths:
+            if path.startswith(os.path.join(root, "")):
+                return any(part in ignored_directories for part in os.path.relpath(path, root).split(os.sep))
+        return False
+
+    def wait(self):
+        """ Wait until something changed and nothing changed during the debounce period, then get the changed paths """
+        while not self.changed.wait(0.5):
+            pass
+        while True:
+            with self.lock:
+                remaining = self.last_change + self.debounce - time.monotonic()
+                if remaining <= 0:
+                    changes = self.changes
+                    self.changes = set()
+                    self.changed.clear()
+                    return changes
+            time.sleep(remaining)
+
+    def poll(self):
+        """ Compare snapshots of the directories until the watcher is stopped """
+        snapshot = self.get_snapshot()
+        while not self.stopped.wait(self.poll_interval):
+            current = self.get_snapshot()
+            self.add([path for path in set(snapshot) | set(current) if snapshot.get(path) != current.get(path)])
+            snapshot = current
+
+    def get_snapshot(self):
+        """ Get the modification time and size of every file that is not ignored """
+        snapshot = {}
+        for path, recursive in self.paths:
+            directories = [path]
+            while directories:
+                try:
+                    entries = list(os.scandir(directories.pop()))
+                except OSError:
+                    continue
+                for entry in entries:
+                    if self.is_ignored(entry.path):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                directories.append(entry.path)
+                            continue
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
@@ -1,6 +1,7 @@
 # Created by Henry Jooste
 # https://github.com/hfjooste/UnrealPackager
 
+import sys
 from modules.setup import *
 
 print()
@@ -16,15 +17,33 @@ run_setup()
 from modules.tasks import *
 from modules.args import Args
 from modules.config import Config
+from modules.manifest import Manifest
 
 args = Args()
-config = Config()
+if args.restore:
+    restore_artifact(args.restore, args.restore_output)
+    sys.exit(0)
+if args.verify:
+    verify_directory(args.verify)
+    sys.exit(0)
+if args.batch:
+    packages, failures = load_batch(args)
+    run_batch(args, packages, failures)
+    sys.exit(0)
+config = Config(args)
+if args.worker:
+    run_worker(config)
+    sys.exit(0)
+if args.watch:
+    run_watch(args, config)
+    sys.exit(0)
+manifest = Manifest(config.output, config.incremental)
 
-run_pre_task(config)
-package_plugin(config)
-package_project(config)
-deploy_docs(config)
-save_docs_pdf(config)
-create_docs_zip(config)
-create_release(args, config)
-run_post_task(config)
\ No newline at end of file
+pipeline = create_pipeline(args, config, manifest)
+if args.dry_run:
+    pipeline.print_plan()
+else:
+    try:
+        pipeline.run()
+    finally:
+        write_report(config)
\ No newline at end of file